@@ -0,0 +1,48 @@
+"""add embedding status for deferred backfill
+
+Revision ID: 20261016_0001
+Revises: 20251122_0001
+Create Date: 2026-10-16 00:01:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0001'
+down_revision: Union[str, None] = '20251122_0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Track which sections still need an embedding
+    op.add_column(
+        'document_sections',
+        sa.Column('embedding_status', sa.String(), nullable=False, server_default='pending')
+    )
+    op.add_column(
+        'document_sections',
+        sa.Column('embedding_attempts', sa.Integer(), nullable=False, server_default='0')
+    )
+    op.create_index('ix_document_sections_embedding_status', 'document_sections', ['embedding_status'])
+
+    # Zero vectors were written as a fallback when embedding failed; requeue them
+    op.execute("""
+        UPDATE document_sections
+        SET embedding = NULL
+        WHERE embedding IS NOT NULL AND vector_norm(embedding) = 0
+    """)
+    op.execute("""
+        UPDATE document_sections
+        SET embedding_status = 'ready'
+        WHERE embedding IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_sections_embedding_status', table_name='document_sections')
+    op.drop_column('document_sections', 'embedding_attempts')
+    op.drop_column('document_sections', 'embedding_status')
@@ -0,0 +1,55 @@
+"""add binary embedding signatures for two-phase search
+
+Revision ID: 20261016_0002
+Revises: 20261016_0001
+Create Date: 2026-10-16 00:02:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import BIT
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0002'
+down_revision: Union[str, None] = '20261016_0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One sign bit per dimension: 96 bytes per section instead of 3 KB
+    op.add_column(
+        'document_sections',
+        sa.Column('embedding_bits', BIT(768), nullable=True)
+    )
+
+    # Backfill signatures from existing embeddings
+    op.execute("""
+        UPDATE document_sections ds
+        SET embedding_bits = (
+            SELECT string_agg(CASE WHEN t.x > 0 THEN '1' ELSE '0' END, '' ORDER BY t.i)
+            FROM unnest(ds.embedding::real[]) WITH ORDINALITY AS t(x, i)
+        )::bit(768)
+        WHERE ds.embedding IS NOT NULL
+    """)
+
+    # Hamming-distance index for the two-phase first pass (ORDER BY embedding_bits <~> ...).
+    # HNSW over bit columns needs pgvector 0.7+; older servers keep exact search only.
+    version = op.get_bind().execute(
+        sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    ).scalar()
+    if version and tuple(int(part) for part in version.split(".")[:2]) >= (0, 7):
+        op.execute("""
+            CREATE INDEX document_sections_embedding_bits_idx
+            ON document_sections
+            USING hnsw (embedding_bits bit_hamming_ops)
+        """)
+    else:
+        print(f"pgvector {version} has no HNSW bit index; leave SEARCH_TWO_PHASE off")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS document_sections_embedding_bits_idx")
+    op.drop_column('document_sections', 'embedding_bits')
@@ -0,0 +1,54 @@
+"""add ingestion_tasks work queue
+
+Revision ID: 20261016_0003
+Revises: 20261016_0002
+Create Date: 2026-10-16 00:03:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSON
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0003'
+down_revision: Union[str, None] = '20261016_0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ingestion_tasks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('stage', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('payload', JSON(), nullable=True),
+        sa.Column('source_id', sa.Integer(), sa.ForeignKey('document_sources.id'), nullable=True),
+        sa.Column('document_id', sa.Integer(), sa.ForeignKey('documents.id'), nullable=True),
+        sa.Column('crawl_job_id', sa.Integer(), sa.ForeignKey('crawl_jobs.id'), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='5'),
+        sa.Column('available_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('locked_by', sa.String(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+    op.create_index('ix_ingestion_tasks_stage', 'ingestion_tasks', ['stage'])
+    op.create_index('ix_ingestion_tasks_status', 'ingestion_tasks', ['status'])
+    op.create_index('ix_ingestion_tasks_document_id', 'ingestion_tasks', ['document_id'])
+    op.create_index('ix_ingestion_tasks_crawl_job_id', 'ingestion_tasks', ['crawl_job_id'])
+
+    # Serves the claim query: pending work per stage, oldest first
+    op.execute("""
+        CREATE INDEX ix_ingestion_tasks_claim
+        ON ingestion_tasks (stage, available_at)
+        WHERE status = 'pending'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('ingestion_tasks')
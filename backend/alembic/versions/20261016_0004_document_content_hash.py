@@ -0,0 +1,44 @@
+"""add documents.content_hash for duplicate detection
+
+Revision ID: 20261016_0004
+Revises: 20261016_0003
+Create Date: 2026-10-16 00:04:00.000000
+
+"""
+from typing import Sequence, Union
+import hashlib
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0004'
+down_revision: Union[str, None] = '20261016_0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _content_hash(text: str) -> str:
+    # Frozen copy of app.services.chunker.content_hash
+    normalized = " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.create_index('ix_documents_content_hash', 'documents', ['content_hash'])
+
+    # Hash existing documents (normalization needs Python, not SQL)
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, content_text FROM documents")).fetchall()
+    for row in rows:
+        conn.execute(
+            sa.text("UPDATE documents SET content_hash = :hash WHERE id = :id"),
+            {"hash": _content_hash(row.content_text), "id": row.id}
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_content_hash', table_name='documents')
+    op.drop_column('documents', 'content_hash')
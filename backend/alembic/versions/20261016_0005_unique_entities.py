@@ -0,0 +1,47 @@
+"""make entities unique on (name, type) for bulk upserts
+
+Revision ID: 20261016_0005
+Revises: 20261016_0004
+Create Date: 2026-10-16 00:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0005'
+down_revision: Union[str, None] = '20261016_0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Merge duplicate entities into the oldest row before adding the constraint
+    op.execute("""
+        CREATE TEMP TABLE entity_merge AS
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY name, type) AS keep_id
+            FROM entities
+        ) e
+        WHERE id <> keep_id
+    """)
+    op.execute("""
+        INSERT INTO document_entities (document_id, entity_id)
+        SELECT de.document_id, m.keep_id
+        FROM document_entities de
+        JOIN entity_merge m ON de.entity_id = m.id
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("DELETE FROM document_entities WHERE entity_id IN (SELECT id FROM entity_merge)")
+    op.execute("DELETE FROM entities WHERE id IN (SELECT id FROM entity_merge)")
+    op.execute("DROP TABLE entity_merge")
+
+    op.drop_index('ix_entities_name_type', table_name='entities')
+    op.create_index('ix_entities_name_type', 'entities', ['name', 'type'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_entities_name_type', table_name='entities')
+    op.create_index('ix_entities_name_type', 'entities', ['name', 'type'])
@@ -0,0 +1,50 @@
+"""add document_sections.chunk_hash and embedding_reused for embedding dedup
+
+Revision ID: 20261016_0006
+Revises: 20261016_0005
+Create Date: 2026-10-16 00:06:00.000000
+
+"""
+from typing import Sequence, Union
+import hashlib
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0006'
+down_revision: Union[str, None] = '20261016_0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _content_hash(text: str) -> str:
+    # Frozen copy of app.services.chunker.content_hash
+    normalized = " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column('document_sections', sa.Column('chunk_hash', sa.String(64), nullable=True))
+    op.add_column(
+        'document_sections',
+        sa.Column('embedding_reused', sa.Boolean(), nullable=False, server_default=sa.false())
+    )
+
+    # Hash existing sections so their embeddings can be reused
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, text FROM document_sections")).fetchall()
+    for row in rows:
+        conn.execute(
+            sa.text("UPDATE document_sections SET chunk_hash = :hash WHERE id = :id"),
+            {"hash": _content_hash(row.text), "id": row.id}
+        )
+
+    op.create_index('ix_document_sections_chunk_hash', 'document_sections', ['chunk_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_sections_chunk_hash', table_name='document_sections')
+    op.drop_column('document_sections', 'embedding_reused')
+    op.drop_column('document_sections', 'chunk_hash')
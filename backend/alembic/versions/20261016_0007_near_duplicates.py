@@ -0,0 +1,42 @@
+"""add MinHash signatures and LSH bands for near-duplicate detection
+
+Revision ID: 20261016_0007
+Revises: 20261016_0006
+Create Date: 2026-10-16 00:07:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0007'
+down_revision: Union[str, None] = '20261016_0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('minhash', ARRAY(sa.Integer()), nullable=True))
+    op.add_column(
+        'documents',
+        sa.Column('near_duplicate_of_id', sa.Integer(), sa.ForeignKey('documents.id'), nullable=True)
+    )
+
+    op.create_table(
+        'document_lsh_bands',
+        sa.Column('document_id', sa.Integer(), sa.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('band', sa.SmallInteger(), primary_key=True),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+    )
+    op.create_index('ix_document_lsh_bands_band_bucket', 'document_lsh_bands', ['band', 'bucket'])
+
+    # Existing documents are indexed with: python -m app.services.near_duplicates
+
+
+def downgrade() -> None:
+    op.drop_table('document_lsh_bands')
+    op.drop_column('documents', 'near_duplicate_of_id')
+    op.drop_column('documents', 'minhash')
@@ -0,0 +1,42 @@
+"""add pdf_extractions log for extraction timing and files needing OCR
+
+Revision ID: 20261016_0008
+Revises: 20261016_0007
+Create Date: 2026-10-16 00:08:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0008'
+down_revision: Union[str, None] = '20261016_0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'pdf_extractions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('source_id', sa.Integer(), sa.ForeignKey('document_sources.id'), nullable=True),
+        sa.Column('url', sa.String(), nullable=True),
+        sa.Column('file_path', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('extractor', sa.String(), nullable=True),
+        sa.Column('cached', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('text_layer', sa.Boolean(), nullable=True),
+        sa.Column('font_count', sa.Integer(), nullable=True),
+        sa.Column('page_count', sa.Integer(), nullable=True),
+        sa.Column('elapsed_ms', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+    op.create_index('ix_pdf_extractions_source_id', 'pdf_extractions', ['source_id'])
+    op.create_index('ix_pdf_extractions_url', 'pdf_extractions', ['url'])
+    op.create_index('ix_pdf_extractions_status', 'pdf_extractions', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_table('pdf_extractions')
@@ -0,0 +1,29 @@
+"""add bytes downloaded and saved by conditional requests to crawl_jobs
+
+Revision ID: 20261016_0009
+Revises: 20261016_0008
+Create Date: 2026-10-16 00:09:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0009'
+down_revision: Union[str, None] = '20261016_0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('crawl_jobs', sa.Column('bytes_downloaded', sa.BigInteger(), nullable=False, server_default='0'))
+    op.add_column('crawl_jobs', sa.Column('bytes_saved', sa.BigInteger(), nullable=False, server_default='0'))
+    op.add_column('crawl_jobs', sa.Column('not_modified', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('crawl_jobs', 'not_modified')
+    op.drop_column('crawl_jobs', 'bytes_saved')
+    op.drop_column('crawl_jobs', 'bytes_downloaded')
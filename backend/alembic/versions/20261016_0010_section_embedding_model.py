@@ -0,0 +1,26 @@
+"""add document_sections.embedding_model so embeddings are only reused within one model
+
+Revision ID: 20261016_0010
+Revises: 20261016_0009
+Create Date: 2026-10-16 00:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0010'
+down_revision: Union[str, None] = '20261016_0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing embeddings stay NULL: which backend produced them is unknown, so they aren't reused
+    op.add_column('document_sections', sa.Column('embedding_model', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('document_sections', 'embedding_model')
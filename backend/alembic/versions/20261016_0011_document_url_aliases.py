@@ -0,0 +1,31 @@
+"""add URL aliases for exact-duplicate documents
+
+Revision ID: 20261016_0011
+Revises: 20261016_0010
+Create Date: 2026-10-16 00:11:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0011'
+down_revision: Union[str, None] = '20261016_0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'document_url_aliases',
+        sa.Column('url', sa.String(), primary_key=True),
+        sa.Column('document_id', sa.Integer(), sa.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_document_url_aliases_document_id', 'document_url_aliases', ['document_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('document_url_aliases')
@@ -7,7 +7,42 @@ class Settings(BaseSettings):
     database_url: str
 
     # AI
-    gemini_api_key: str
+    ai_backend: str = "gemini"  # gemini or local (deterministic, offline)
+    gemini_api_key: str = ""
+    embedding_batch_size: int = 100  # Chunks per batch embedding request (max 100)
+    embedding_max_attempts: int = 5  # Backfill attempts before a section is marked failed
+    defer_embeddings: bool = False  # Store sections unembedded and leave them to the backfill worker
+    ai_generate_rpm: int = 60  # Gemini text generation quota (requests per minute)
+    ai_generate_burst: int = 5
+    ai_embed_rpm: int = 1500  # Gemini embedding quota (requests per minute)
+    ai_embed_burst: int = 50
+    ai_max_concurrency: int = 4  # In-flight AI calls for the async provider
+    ai_enrichment_mode: str = "combined"  # combined (one call per document) or separate
+    ai_cache_enabled: bool = True
+    ai_cache_path: str = "../storage/ai_cache.sqlite3"
+    ai_cache_max_mb: int = 256
+
+    # Ingestion pipeline
+    ingestion_mode: str = "inline"  # inline (process in the request) or queued (ingestion_tasks workers)
+    ingestion_poll_seconds: float = 2.0  # Worker sleep when no task is available
+    ingestion_retry_base_seconds: int = 30  # Backoff doubles on each failed attempt
+    ingestion_lock_timeout_seconds: int = 900  # Running tasks older than this are reclaimed
+    tag_id_cache_size: int = 1000
+    chunk_max_tokens: int = 200  # Rough tokens (words and punctuation) per section
+    chunk_max_chars: int = 1000  # Capped at EMBEDDING_MAX_CHARS, the text embedded per section
+    chunk_min_tokens: int = 24  # Smaller trailing pieces are merged into the previous section
+    chunk_overlap_sentences: int = 1
+    near_duplicate_threshold: float = 0.9  # Estimated Jaccard similarity to reuse enrichment (0 disables)
+    minhash_permutations: int = 128
+    minhash_bands: int = 16  # Must divide minhash_permutations
+    entity_id_cache_size: int = 20000
+
+    # Search
+    search_two_phase: bool = False  # Binary-signature first pass, then full-precision rescoring; needs pgvector 0.7+ for its HNSW index
+    search_rescore_factor: int = 10  # Candidates rescored per requested result
+    query_cache_size: int = 1000
+    query_cache_ttl_seconds: int = 3600
+    query_cache_warm_size: int = 50  # Top queries to pre-embed at startup (0 disables)
 
     # Auth
     jwt_secret: str
@@ -17,8 +52,31 @@ class Settings(BaseSettings):
     # CORS
     allowed_origins: str = "http://localhost:3000"
 
+    # PDF extraction
+    pdf_parallel_workers: int = 4  # Process pool size; 1 disables parallel extraction
+    pdf_parallel_min_pages: int = 40  # Smaller PDFs are extracted serially
+    pdf_pages_per_task: int = 20  # Pages per pool task
+    pdf_page_timeout_seconds: int = 30  # Per-page limit in pool workers; slower pages are skipped
+    pdf_prescan_pages: int = 5  # Pages sampled to detect a text layer and pick an extractor
+    pdf_heavy_page_kb: int = 256  # Average content stream size above which PyPDF2 is used first
+    extraction_cache_enabled: bool = True  # Reuse extracted text for files with the same SHA-256
+    extraction_cache_path: str = "../storage/extraction_cache.sqlite3"
+    extraction_cache_max_mb: int = 1024  # Compressed size limit; least recently used entries go first
+    extraction_cache_max_age_days: int = 90  # Entries unused this long are pruned (0 keeps them)
+
+    # Crawling
+    crawl_max_connections: int = 20  # Connection pool shared by all crawls
+    crawl_per_host_concurrency: int = 4  # Simultaneous requests to one host
+    crawl_politeness_delay_seconds: float = 0.25  # Minimum gap between request starts to one host
+    crawl_timeout_seconds: float = 30.0
+    http_cache_enabled: bool = True  # Conditional requests (ETag / Last-Modified) for crawled URLs
+    http_cache_path: str = "../storage/http_cache.sqlite3"
+    http_cache_max_mb: int = 256  # Stored listing and notice page bodies
+
     # Storage
     upload_dir: str = "../storage/uploads"
+    max_pdf_size_mb: int = 100  # Larger downloads and uploads are rejected while streaming
+    download_max_attempts: int = 3  # Attempts per PDF download; interrupted ones resume with a Range request
 
     # App
     environment: str = "development"
@@ -3,6 +3,7 @@
 from app.ingestion.simple_scraper import SimpleScraper
 from app.ingestion.dncc_scraper import DNCCScraper
 from app.ingestion.mopa_scraper import MOPAScraper
+from app.ingestion.crawler import AsyncCrawler
 from app.models.document_source import DocumentSource
 
 
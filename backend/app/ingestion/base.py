@@ -1,12 +1,18 @@
 """
 Base scraper class for document ingestion.
 Provides common methods for fetching and processing documents.
+Subclasses only parse pages; fetching is done here or, concurrently, by
+the async crawl engine (app.ingestion.crawler).
 """
 import httpx
 from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
 from abc import ABC, abstractmethod
 
+from app.ingestion import http_cache
+from app.ingestion.download import CHUNK_SIZE, ResumableDownload
+from app.ingestion.http_cache import TransferStats
+
 
 class BaseScraper(ABC):
     """Base class for website scrapers."""
@@ -14,26 +20,40 @@ class BaseScraper(ABC):
     def __init__(self, base_url: str):
         self.base_url = base_url
         self.client = httpx.Client(timeout=30.0, follow_redirects=True)
+        self.transfer = TransferStats()  # Bytes downloaded and saved by conditional requests
 
     def fetch_page(self, url: str) -> Optional[str]:
-        """Fetch HTML content from a URL."""
+        """
+        Fetch HTML content from a URL.
+        Cached pages are requested conditionally; a 304 returns the stored body.
+        """
         try:
-            response = self.client.get(url)
-            response.raise_for_status()
-            return response.text
+            entry, headers = http_cache.page_validators(url)
+            response = self.client.get(url, headers=headers)
+            return http_cache.read_page(url, entry, response, self.transfer)
         except Exception as e:
             print(f"Error fetching {url}: {e}")
             return None
 
     def fetch_pdf(self, url: str, save_path: str) -> bool:
-        """Download a PDF file to the specified path."""
+        """
+        Download a PDF file to the specified path.
+        The body is streamed to a temp file (see ResumableDownload), hashed and
+        size-capped as it arrives; an interrupted transfer resumes with a Range
+        request. If the server answers a conditional request with 304, the
+        previous download is linked to save_path instead.
+        """
         try:
-            response = self.client.get(url)
-            response.raise_for_status()
-
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
-
+            with ResumableDownload(url, save_path, self.transfer) as download:
+                while not download.done:
+                    try:
+                        with self.client.stream("GET", url, headers=download.request_headers()) as response:
+                            if download.handle(response):
+                                for chunk in response.iter_bytes(CHUNK_SIZE):
+                                    download.write(chunk)
+                                download.complete(response)
+                    except httpx.TransportError as e:
+                        download.retry(e)
             return True
         except Exception as e:
             print(f"Error downloading PDF from {url}: {e}")
@@ -43,23 +63,75 @@ class BaseScraper(ABC):
         """Parse HTML content with BeautifulSoup."""
         return BeautifulSoup(html, 'lxml')
 
-    @abstractmethod
     def fetch_document_links(self) -> List[Dict[str, str]]:
         """
-        Fetch all document links from the source.
+        Fetch all document links from the source: the base page, then any
+        further listing pages it links to (see listing_pages).
+        Returns a list of dicts with 'url', 'title', and 'type' keys.
+        """
+        html = self.fetch_page(self.base_url)
+        if not html:
+            return []
+
+        soup = self.parse_html(html)
+        documents = self.parse_document_links(soup, self.base_url)
+
+        for page_url in self.listing_pages(soup):
+            page_html = self.fetch_page(page_url)
+            if page_html:
+                documents.extend(self.parse_document_links(self.parse_html(page_html), page_url))
+
+        return documents
+
+    def listing_pages(self, soup: BeautifulSoup) -> List[str]:
+        """Further listing pages (e.g. pagination) linked from the base page. None by default."""
+        return []
+
+    @abstractmethod
+    def parse_document_links(self, soup: BeautifulSoup, page_url: str) -> List[Dict[str, str]]:
+        """
+        Find document links on one fetched listing page.
         Should return a list of dicts with 'url', 'title', and 'type' keys.
         Must be implemented by subclasses.
         """
         pass
 
-    @abstractmethod
-    def fetch_document_content(self, url: str) -> Dict[str, any]:
+    def fetch_document_content(self, url: str) -> Optional[Dict[str, any]]:
         """
         Fetch and process a single document.
-        Should return a dict with document data.
-        Must be implemented by subclasses.
+        PDFs return metadata only; the file is downloaded separately (fetch_pdf).
         """
-        pass
+        if self.is_pdf(url):
+            return self._fetch_pdf_content(url)
+
+        html = self.fetch_page(url)
+        if not html:
+            return None
+        return self.parse_document_content(url, html)
+
+    def is_pdf(self, url: str) -> bool:
+        """Whether a document URL points to a PDF rather than an HTML page."""
+        return url.lower().endswith('.pdf')
+
+    def parse_document_content(self, url: str, html: str) -> Optional[Dict[str, any]]:
+        """
+        Extract a document's title, text and attachments from its fetched HTML.
+        Sources that only list PDFs don't need to implement this.
+        """
+        return None
+
+    def _fetch_pdf_content(self, url: str) -> Dict[str, any]:
+        """
+        Note: This method returns metadata only.
+        Actual PDF processing happens in the ingestion service
+        after downloading the file.
+        """
+        return {
+            'title': url.split('/')[-1].replace('.pdf', ''),
+            'url': url,
+            'type': 'pdf',
+            'text': None  # Will be extracted after download
+        }
 
     def close(self):
         """Close the HTTP client."""
@@ -0,0 +1,236 @@
+"""
+Async crawl engine for the scrapers.
+Listing pages, document pages and PDF downloads are fetched concurrently over
+one shared httpx.AsyncClient. Requests to the same host are limited by a
+semaphore and spaced by a politeness delay; different hosts proceed in parallel.
+Scrapers only parse (see BaseScraper); their fetch methods are bypassed here,
+but requests are conditional the same way (see http_cache) and counted in the
+scraper's transfer stats.
+"""
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from app.config import settings
+from app.ingestion import http_cache
+from app.ingestion.base import BaseScraper
+from app.ingestion.download import CHUNK_SIZE, ResumableDownload
+from app.ingestion.http_cache import TransferStats
+
+
+class HostLimiter:
+    """Concurrency limit and minimum spacing between request starts for one host."""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.lock = asyncio.Lock()
+        self.delay = delay
+        self.next_start = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold one of the host's request slots; yields the politeness wait in seconds."""
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            async with self.lock:
+                wait = max(0.0, self.next_start - loop.time())
+                if wait:
+                    await asyncio.sleep(wait)
+                self.next_start = loop.time() + self.delay
+            yield wait
+
+
+class AsyncCrawler:
+    """Concurrent fetching for scrapers with per-host limits and a shared connection pool."""
+
+    def __init__(
+        self,
+        max_connections: int,
+        per_host_concurrency: int,
+        politeness_delay: float,
+        timeout: float = 30.0
+    ):
+        self.max_connections = max_connections
+        self.per_host_concurrency = per_host_concurrency
+        self.politeness_delay = politeness_delay
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, HostLimiter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Statistics
+        self.requests = 0
+        self.errors = 0
+        self.politeness_wait_seconds = 0.0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the client (and host limiters) for the running event loop on first use."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # Clients and asyncio primitives can't be shared across event loops
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            self._hosts = {}
+            self._loop = loop
+        return self._client
+
+    @asynccontextmanager
+    async def _request_slot(self, url: str) -> AsyncIterator[httpx.AsyncClient]:
+        """Wait for a request slot on the URL's host and yield the shared client."""
+        client = self._get_client()
+        host = urlparse(url).netloc
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = self._hosts[host] = HostLimiter(self.per_host_concurrency, self.politeness_delay)
+
+        async with limiter.slot() as wait:
+            self.requests += 1
+            self.politeness_wait_seconds += wait
+            yield client
+
+    async def fetch_page(self, url: str, transfer: Optional[TransferStats] = None) -> Optional[str]:
+        """
+        Fetch HTML content from a URL.
+        Cached pages are requested conditionally; a 304 returns the stored body.
+        """
+        try:
+            entry, headers = http_cache.page_validators(url)
+            async with self._request_slot(url) as client:
+                response = await client.get(url, headers=headers)
+            return http_cache.read_page(url, entry, response, transfer or TransferStats())
+        except Exception as e:
+            self.errors += 1
+            print(f"Error fetching {url}: {e}")
+            return None
+
+    async def fetch_pdf(self, url: str, save_path: str, transfer: Optional[TransferStats] = None) -> bool:
+        """
+        Download a PDF file to the specified path, streamed like BaseScraper.fetch_pdf:
+        size-capped, hashed as it arrives and resumed with a Range request if
+        interrupted. A 304 to a conditional request links the previous download instead.
+        """
+        transfer = transfer or TransferStats()
+        try:
+            with ResumableDownload(url, save_path, transfer) as download:
+                while not download.done:
+                    try:
+                        async with self._request_slot(url) as client:
+                            async with client.stream("GET", url, headers=download.request_headers()) as response:
+                                # A 304 may copy the previous download, so keep file work off the loop
+                                if await asyncio.to_thread(download.handle, response):
+                                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                                        download.write(chunk)
+                                    await asyncio.to_thread(download.complete, response)
+                    except httpx.TransportError as e:
+                        download.retry(e)
+            return True
+        except Exception as e:
+            self.errors += 1
+            print(f"Error downloading PDF from {url}: {e}")
+            return False
+
+    async def download_pdf(self, url: str, transfer: Optional[TransferStats] = None) -> Optional[str]:
+        """Download a PDF under settings.upload_dir with a fresh name. Returns its path, or None."""
+        os.makedirs(settings.upload_dir, exist_ok=True)
+        file_path = os.path.join(settings.upload_dir, f"{uuid.uuid4()}.pdf")
+        return file_path if await self.fetch_pdf(url, file_path, transfer) else None
+
+    async def fetch_document_links(self, scraper: BaseScraper) -> List[Dict[str, str]]:
+        """
+        Async counterpart of BaseScraper.fetch_document_links: the base page is
+        fetched once, then all further listing pages at the same time.
+        """
+        html = await self.fetch_page(scraper.base_url, scraper.transfer)
+        if not html:
+            return []
+
+        soup = scraper.parse_html(html)
+        documents = scraper.parse_document_links(soup, scraper.base_url)
+
+        page_urls = scraper.listing_pages(soup)
+        pages = await asyncio.gather(*(self.fetch_page(page_url, scraper.transfer) for page_url in page_urls))
+        for page_url, page_html in zip(page_urls, pages):
+            if page_html:
+                documents.extend(scraper.parse_document_links(scraper.parse_html(page_html), page_url))
+
+        return documents
+
+    async def fetch_document_content(self, scraper: BaseScraper, url: str) -> Optional[Dict[str, Any]]:
+        """Async counterpart of BaseScraper.fetch_document_content."""
+        if scraper.is_pdf(url):
+            return scraper._fetch_pdf_content(url)
+
+        html = await self.fetch_page(url, scraper.transfer)
+        if not html:
+            return None
+        return scraper.parse_document_content(url, html)
+
+    async def _fetch_document(
+        self,
+        scraper: BaseScraper,
+        link: Dict[str, str]
+    ) -> Tuple[Dict[str, str], Optional[Dict[str, Any]]]:
+        try:
+            doc_data = await self.fetch_document_content(scraper, link['url'])
+            if doc_data and doc_data['type'] == 'pdf':
+                doc_data['file_path'] = await self.download_pdf(doc_data['url'], scraper.transfer)
+            return link, doc_data
+        except Exception as e:
+            print(f"Error fetching document {link['url']}: {e}")
+            return link, None
+
+    async def fetch_documents(
+        self,
+        scraper: BaseScraper,
+        links: List[Dict[str, str]]
+    ) -> AsyncIterator[Tuple[Dict[str, str], Optional[Dict[str, Any]]]]:
+        """
+        Fetch documents concurrently and yield (link, doc_data) as each completes.
+        PDFs are downloaded too; doc_data['file_path'] is None if that failed.
+        Fetching continues in the background while the caller processes results.
+        """
+        tasks = [asyncio.ensure_future(self._fetch_document(scraper, link)) for link in links]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters and the time spent waiting on politeness delays."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "politeness_wait_seconds": round(self.politeness_wait_seconds, 3),
+            "hosts": len(self._hosts),
+            "max_connections": self.max_connections,
+            "per_host_concurrency": self.per_host_concurrency,
+            "politeness_delay_seconds": self.politeness_delay,
+        }
+
+    async def close(self):
+        """Close the shared HTTP client."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+# Singleton instance
+crawler = AsyncCrawler(
+    max_connections=settings.crawl_max_connections,
+    per_host_concurrency=settings.crawl_per_host_concurrency,
+    politeness_delay=settings.crawl_politeness_delay_seconds,
+    timeout=settings.crawl_timeout_seconds
+)
@@ -17,20 +17,13 @@ class DNCCScraper(BaseScraper):
         super().__init__(base_url)
         self.url_pattern = url_pattern
 
-    def fetch_document_links(self) -> List[Dict[str, str]]:
+    def parse_document_links(self, soup, page_url: str) -> List[Dict[str, str]]:
         """
-        Fetch all notice links from DNCC notices page.
+        Find all notice links on the DNCC notices page.
         Returns list of dicts with url, title, and type.
         """
         documents = []
 
-        # Fetch the notices page
-        html = self.fetch_page(self.base_url)
-        if not html:
-            return documents
-
-        soup = self.parse_html(html)
-
         # Find notice cards - DNCC uses various card/list structures
         # Try multiple selectors to find notice cards
         card_selectors = [
@@ -132,23 +125,11 @@ class DNCCScraper(BaseScraper):
 
         return documents
 
-    def fetch_document_content(self, url: str) -> Dict[str, any]:
+    def parse_document_content(self, url: str, html: str) -> Dict[str, any]:
         """
-        Fetch a single notice and extract its content.
-        For HTML pages: extracts text and finds PDF attachments.
-        For PDFs: returns metadata only.
+        Extract content from an HTML notice page.
+        Also finds PDF attachments; PDFs themselves return metadata only.
         """
-        if url.lower().endswith('.pdf'):
-            return self._fetch_pdf_content(url)
-        else:
-            return self._fetch_html_content(url)
-
-    def _fetch_html_content(self, url: str) -> Dict[str, any]:
-        """Extract content from an HTML notice page."""
-        html = self.fetch_page(url)
-        if not html:
-            return None
-
         soup = self.parse_html(html)
 
         # Try to find the main content
@@ -203,15 +184,3 @@ class DNCCScraper(BaseScraper):
             'type': 'html',
             'pdf_links': pdf_links
         }
-
-    def _fetch_pdf_content(self, url: str) -> Dict[str, any]:
-        """
-        Note: This method returns metadata only.
-        Actual PDF processing happens in the ingestion service.
-        """
-        return {
-            'title': url.split('/')[-1].replace('.pdf', ''),
-            'url': url,
-            'type': 'pdf',
-            'text': None
-        }
@@ -0,0 +1,297 @@
+"""
+Streaming file writes for PDF downloads and uploads.
+Bodies are written in chunks to a temporary file next to the destination,
+hashed (SHA-256) as they are written and capped at settings.max_pdf_size_mb,
+then renamed into place atomically. Interrupted downloads resume with an
+HTTP Range request, validated with If-Range so a changed file starts over.
+Downloads also answer conditional requests from the validator cache (see
+http_cache); ResumableDownload holds that status handling for both the sync
+scraper and the async crawler.
+"""
+import hashlib
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.config import settings
+from app.ingestion import http_cache
+from app.ingestion.http_cache import TransferStats
+from app.services.extraction_cache import remember_file_hash
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(?:\d+|\*)")
+
+
+class FileTooLarge(ValueError):
+    """The body exceeds settings.max_pdf_size_mb."""
+
+
+def max_file_bytes() -> int:
+    return settings.max_pdf_size_mb * 1024 * 1024
+
+
+class StreamedFile:
+    """A file written chunk by chunk to a temp path, hashed on the fly and renamed into place by finish()."""
+
+    def __init__(self, save_path: str, part_path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.save_path = save_path
+        self.part_path = part_path or f"{save_path}.part"
+        self.max_bytes = max_bytes if max_bytes is not None else max_file_bytes()
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = None
+
+    def open(self, append: bool = False):
+        """Start writing; with append, continue after the bytes already in the temp file."""
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+        if append and os.path.exists(self.part_path):
+            # Hash what an earlier attempt already wrote
+            with open(self.part_path, 'rb') as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    self._digest.update(chunk)
+                    self.size += len(chunk)
+            self._file = open(self.part_path, 'ab')
+        else:
+            self._file = open(self.part_path, 'wb')
+
+    def check_length(self, remaining: Optional[int]):
+        """Reject a body whose announced length would exceed the cap, before reading it."""
+        if remaining is not None and self.size + remaining > self.max_bytes:
+            raise FileTooLarge(f"File is {self.size + remaining} bytes, over the {settings.max_pdf_size_mb} MB limit")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise FileTooLarge(f"File exceeds the {settings.max_pdf_size_mb} MB limit")
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self) -> Tuple[str, int]:
+        """Flush, move the temp file to save_path atomically and return (sha256, size)."""
+        self._close(sync=True)
+        os.replace(self.part_path, self.save_path)
+
+        digest = self._digest.hexdigest()
+        remember_file_hash(self.save_path, digest)
+        return digest, self.size
+
+    def discard(self):
+        """Close and delete the temp file."""
+        self._close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def _close(self, sync: bool = False):
+        if self._file is not None:
+            if sync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+
+class DownloadInProgress(Exception):
+    """Another worker is already downloading this URL."""
+
+
+def _try_lock(fd: int) -> bool:
+    """Take an exclusive lock on an open file without waiting; False if someone else holds it."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class ResumableDownload(StreamedFile):
+    """
+    A StreamedFile for an HTTP download of a PDF, used as a context manager
+    around the request loop (see BaseScraper.fetch_pdf):
+
+        with ResumableDownload(url, save_path, transfer) as download:
+            while not download.done:
+                try:
+                    response = <GET url with download.request_headers(), streamed>
+                    if download.handle(response):
+                        <download.write() each body chunk>
+                        download.complete(response)
+                except httpx.TransportError as e:
+                    download.retry(e)
+
+    The temp file is named after the URL, so a later attempt (or a retried
+    ingestion task) resumes where the last one stopped, provided the
+    server's validator still matches. An exclusive lock on it keeps two
+    workers from writing the same file; the second raises DownloadInProgress.
+    """
+
+    def __init__(self, url: str, save_path: str, transfer: TransferStats, max_bytes: Optional[int] = None):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        directory = os.path.dirname(save_path)
+        super().__init__(save_path, os.path.join(directory, f".{key}.part"), max_bytes)
+        self.url = url
+        self.transfer = transfer
+        self.validator_path = f"{self.part_path}.validator"
+        self.lock_path = f"{self.part_path}.lock"
+        self.received = 0  # Bytes transferred by this download, excluding resumed ones
+        self.attempt = 1
+        self.done = False
+        self._lock_fd: Optional[int] = None
+        self.entry, self._validators = http_cache.pdf_validators(url)
+
+    def __enter__(self) -> "ResumableDownload":
+        while True:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            if not _try_lock(fd):
+                os.close(fd)
+                raise DownloadInProgress(f"{self.url} is already being downloaded")
+
+            # The holder unlinks the lock file when done; if that happened after
+            # we opened it, our lock is on a stale file, so take a fresh one
+            try:
+                current = os.stat(self.lock_path)
+            except FileNotFoundError:
+                current = None
+            if current is not None and current.st_ino == os.fstat(fd).st_ino:
+                self._lock_fd = fd
+                return self
+            os.close(fd)
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            if issubclass(exc_type, httpx.TransportError):
+                # Keep the partial file so a later attempt can resume
+                self.suspend()
+            else:
+                self.discard()
+
+        if fcntl is not None:
+            # Unlink while still holding the lock; see __enter__ for the other side
+            os.remove(self.lock_path)
+            os.close(self._lock_fd)
+        else:
+            # Windows can't delete an open file; closing releases the lock, and
+            # the file stays if another worker has opened it in the meantime
+            os.close(self._lock_fd)
+            try:
+                os.remove(self.lock_path)
+            except OSError:
+                pass
+        self._lock_fd = None
+        return False
+
+    def request_headers(self) -> Dict[str, str]:
+        """Conditional headers for the cached copy plus Range headers for a partial one."""
+        return {**self._validators, **self.resume_headers()}
+
+    def resume_headers(self) -> Dict[str, str]:
+        """Range / If-Range headers to continue a partial download, if one can be resumed."""
+        if not os.path.exists(self.part_path) or not os.path.exists(self.validator_path):
+            return {}
+
+        with open(self.validator_path, encoding="utf-8") as f:
+            validator = f.read().strip()
+        size = os.path.getsize(self.part_path)
+        if not validator or not size:
+            return {}
+        return {"Range": f"bytes={size}-", "If-Range": validator}
+
+    def handle(self, response) -> bool:
+        """
+        Act on a response's status. Returns True if its body should be written
+        (then call complete); False when there is nothing to read: a 304 was
+        answered with the previous download (done is set), or the previous
+        file has gone and the request must be repeated unconditionally.
+        """
+        if response.status_code == 304:
+            if http_cache.reuse_pdf(self.entry, self.save_path, self.transfer):
+                self.done = True
+            else:
+                self._validators = {}
+            return False
+
+        self.begin(response)
+        return True
+
+    def begin(self, response):
+        """
+        Open the temp file for a response: append on a 206 that continues the
+        partial file, start over on a 200. Raises for error statuses.
+        """
+        response.raise_for_status()
+
+        append = False
+        if response.status_code == 206:
+            match = CONTENT_RANGE.match(response.headers.get("content-range", ""))
+            partial_size = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+            if not match or int(match.group(1)) != partial_size:
+                raise ValueError(f"Unexpected Content-Range: {response.headers.get('content-range')}")
+            append = True
+
+        self.open(append=append)
+
+        length = response.headers.get("content-length")
+        self.check_length(int(length) if length and length.isdigit() else None)
+
+        # Remember what the partial file belongs to, so it can be resumed with If-Range
+        validator = _range_validator(response.headers)
+        if validator:
+            with open(self.validator_path, "w", encoding="utf-8") as f:
+                f.write(validator)
+        elif os.path.exists(self.validator_path):
+            os.remove(self.validator_path)
+
+    def write(self, chunk: bytes):
+        super().write(chunk)
+        self.received += len(chunk)
+
+    def complete(self, response):
+        """Move the finished file into place and record its validators."""
+        digest, size = self.finish()
+        http_cache.record_pdf(
+            self.url, self.entry, response.headers, digest, size, self.save_path, self.transfer, self.received
+        )
+        self.done = True
+
+    def retry(self, error: Exception):
+        """After an interrupted transfer: keep the partial file, or re-raise once out of attempts."""
+        self.suspend()
+        if self.attempt >= settings.download_max_attempts:
+            raise error
+        self.attempt += 1
+        print(f"Download of {self.url} interrupted at {self.size} bytes ({error}), resuming")
+
+    def suspend(self):
+        """Close after an interruption, keeping the partial file to resume from."""
+        self._close()
+
+    def finish(self) -> Tuple[str, int]:
+        result = super().finish()
+        if os.path.exists(self.validator_path):
+            os.remove(self.validator_path)
+        return result
+
+    def discard(self):
+        super().discard()
+        if os.path.exists(self.validator_path):
+            os.remove(self.validator_path)
+
+
+def _range_validator(headers) -> Optional[str]:
+    """A strong ETag, else Last-Modified: what If-Range accepts."""
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("last-modified")
@@ -0,0 +1,321 @@
+"""
+Persistent HTTP validator cache for crawling.
+Stores URL -> ETag, Last-Modified and a SHA-256 of the last body in a local
+SQLite file, so fetches can be conditional. Page bodies are kept
+(zlib-compressed) to answer a 304; for PDFs the last downloaded file is reused.
+Least recently used entries are evicted once stored bodies exceed the size limit.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from app.config import settings
+
+
+class CachedResponse(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_hash: str
+    size: int  # Bytes of the last full response body
+    body: Optional[bytes]  # Pages only
+    file_path: Optional[str]  # PDFs only: where the last download was saved
+
+
+class TransferStats:
+    """Bytes downloaded and saved by conditional requests, counted per crawl."""
+
+    def __init__(self):
+        self.downloaded_bytes = 0
+        self.saved_bytes = 0
+        self.not_modified = 0  # 304 responses
+        self.unchanged = 0  # 200 responses whose body hash matched the cache
+
+    def record_download(self, size: int, unchanged: bool):
+        self.downloaded_bytes += size
+        if unchanged:
+            self.unchanged += 1
+
+    def record_not_modified(self, size: int):
+        self.saved_bytes += size
+        self.not_modified += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "downloaded_bytes": self.downloaded_bytes,
+            "saved_bytes": self.saved_bytes,
+            "not_modified": self.not_modified,
+            "unchanged": self.unchanged,
+        }
+
+
+def body_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def validator_headers(entry: Optional[CachedResponse]) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since headers for a cached response."""
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+def reuse_file(entry: Optional[CachedResponse], save_path: str) -> bool:
+    """Hard-link (or copy) the previously downloaded file to save_path. False if it's gone."""
+    if entry is None or not entry.file_path or not os.path.exists(entry.file_path):
+        return False
+
+    try:
+        os.link(entry.file_path, save_path)
+    except OSError:
+        shutil.copyfile(entry.file_path, save_path)
+    return True
+
+
+def page_validators(url: str) -> Tuple[Optional[CachedResponse], Dict[str, str]]:
+    """Cached entry and conditional headers for a page; only entries with a stored body qualify."""
+    entry = http_cache.get(url)
+    if entry is None or entry.body is None:
+        return entry, {}
+    return entry, validator_headers(entry)
+
+
+def read_page(url: str, entry: Optional[CachedResponse], response: Any, transfer: TransferStats) -> str:
+    """
+    Page text for a response: the stored body on a 304, otherwise the new body,
+    which is cached unless it is unchanged and its validators are the same.
+    """
+    if response.status_code == 304 and entry is not None and entry.body is not None:
+        transfer.record_not_modified(entry.size)
+        return entry.body.decode("utf-8")
+
+    response.raise_for_status()
+    content = response.content
+    digest = body_hash(content)
+    unchanged = entry is not None and entry.body_hash == digest
+    transfer.record_download(len(content), unchanged)
+
+    text = response.text
+    if not (unchanged and entry.body is not None and _same_validators(entry, response.headers)):
+        http_cache.put(url, response.headers, digest, len(content), body=text.encode("utf-8"))
+    return text
+
+
+def pdf_validators(url: str) -> Tuple[Optional[CachedResponse], Dict[str, str]]:
+    """Cached entry and conditional headers for a PDF; only sent while the last download still exists."""
+    entry = http_cache.get(url)
+    if entry is None or not entry.file_path or not os.path.exists(entry.file_path):
+        return entry, {}
+    return entry, validator_headers(entry)
+
+
+def reuse_pdf(entry: Optional[CachedResponse], save_path: str, transfer: TransferStats) -> bool:
+    """Answer a 304 with the previously downloaded file. False if it has disappeared since."""
+    if not reuse_file(entry, save_path):
+        return False
+    transfer.record_not_modified(entry.size)
+    return True
+
+
+def record_pdf(
+    url: str,
+    entry: Optional[CachedResponse],
+    headers: Any,
+    digest: str,
+    size: int,
+    save_path: str,
+    transfer: TransferStats,
+    received: Optional[int] = None
+):
+    """Store a completed PDF download's validators. received: bytes transferred, if resumed."""
+    transfer.record_download(size if received is None else received, entry is not None and entry.body_hash == digest)
+    http_cache.put(url, headers, digest, size, file_path=save_path)
+
+
+def _same_validators(entry: CachedResponse, headers: Any) -> bool:
+    return entry.etag == headers.get("etag") and entry.last_modified == headers.get("last-modified")
+
+
+class HTTPValidatorCache:
+    """SQLite-backed store of response validators, with page bodies for 304s."""
+
+    def __init__(self, path: str, max_bytes: int, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite database on first use. Must be called with the lock held."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    body BLOB,
+                    stored_bytes INTEGER NOT NULL,
+                    file_path TEXT,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_http_validators_last_access ON http_validators (last_access)"
+            )
+            conn.commit()
+
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(stored_bytes), 0) FROM http_validators"
+            ).fetchone()[0]
+            self._conn = conn
+
+        return self._conn
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached validators (and body) for a URL, or None."""
+        if not self.enabled:
+            return None
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT etag, last_modified, body_hash, size, body, file_path FROM http_validators WHERE url = ?",
+                    (url,)
+                ).fetchone()
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                conn.execute(
+                    "UPDATE http_validators SET last_access = ? WHERE url = ?", (time.time(), url)
+                )
+                conn.commit()
+                self.hits += 1
+
+            etag, last_modified, cached_hash, size, body, file_path = row
+            return CachedResponse(
+                etag, last_modified, cached_hash, size,
+                zlib.decompress(body) if body is not None else None,
+                file_path
+            )
+        except Exception as e:
+            print(f"Error reading HTTP validator cache: {e}")
+            return None
+
+    def put(
+        self,
+        url: str,
+        headers: Any,
+        response_hash: str,
+        size: int,
+        body: Optional[bytes] = None,
+        file_path: Optional[str] = None
+    ):
+        """
+        Store a full response's validators. Pass body for pages (so a 304 can be
+        answered) or file_path for downloads. Responses without an ETag or
+        Last-Modified are still stored so unchanged bodies can be recognized.
+        """
+        if not self.enabled:
+            return
+
+        try:
+            compressed = zlib.compress(body, 6) if body is not None else None
+            stored_bytes = len(compressed) if compressed is not None else 0
+
+            with self._lock:
+                conn = self._connect()
+                previous = conn.execute(
+                    "SELECT stored_bytes FROM http_validators WHERE url = ?", (url,)
+                ).fetchone()
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO http_validators "
+                    "(url, etag, last_modified, body_hash, size, body, stored_bytes, file_path, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        url, headers.get("etag"), headers.get("last-modified"), response_hash, size,
+                        compressed, stored_bytes, file_path, time.time()
+                    )
+                )
+                self._total_bytes += stored_bytes - (previous[0] if previous else 0)
+
+                if self._total_bytes > self.max_bytes:
+                    self._evict(conn)
+
+                conn.commit()
+        except Exception as e:
+            print(f"Error writing HTTP validator cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until stored bodies are back under 90% of the limit."""
+        target = int(self.max_bytes * 0.9)
+
+        # Other worker processes share the file, so recount before evicting
+        self._total_bytes = conn.execute(
+            "SELECT COALESCE(SUM(stored_bytes), 0) FROM http_validators"
+        ).fetchone()[0]
+
+        while self._total_bytes > target:
+            rows = conn.execute(
+                "SELECT url, stored_bytes FROM http_validators WHERE stored_bytes > 0 ORDER BY last_access LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+
+            freed = []
+            for url, stored_bytes in rows:
+                if self._total_bytes <= target:
+                    break
+                freed.append((url,))
+                self._total_bytes -= stored_bytes
+
+            conn.executemany("DELETE FROM http_validators WHERE url = ?", freed)
+            self.evictions += len(freed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and stored body size."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Singleton instance
+http_cache = HTTPValidatorCache(
+    path=settings.http_cache_path,
+    max_bytes=settings.http_cache_max_mb * 1024 * 1024,
+    enabled=settings.http_cache_enabled
+)
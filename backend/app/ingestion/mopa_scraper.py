@@ -18,34 +18,16 @@ class MOPAScraper(BaseScraper):
         self.url_pattern = url_pattern
         self.max_pages = 5  # Limit pagination to 5 pages
 
-    def fetch_document_links(self) -> List[Dict[str, str]]:
+    def listing_pages(self, soup) -> List[str]:
+        """Pagination links on the first page, up to max_pages pages in total."""
+        return self._extract_pagination_links(soup)[:self.max_pages - 1]
+
+    def parse_document_links(self, soup, page_url: str) -> List[Dict[str, str]]:
         """
-        Fetch all notice links from MOPA notices page.
-        Supports pagination up to max_pages.
+        Find all notice links on one MOPA notices page.
         Returns list of dicts with url, title, and type.
         """
-        documents = []
-        pages_to_fetch = [self.base_url]
-
-        # Fetch first page to find pagination links
-        html = self.fetch_page(self.base_url)
-        if html:
-            soup = self.parse_html(html)
-            pagination_links = self._extract_pagination_links(soup)
-            # Limit to max_pages
-            pages_to_fetch.extend(pagination_links[:self.max_pages - 1])
-
-        # Process each page
-        for page_url in pages_to_fetch:
-            html = self.fetch_page(page_url)
-            if not html:
-                continue
-
-            soup = self.parse_html(html)
-            page_documents = self._extract_documents_from_page(soup)
-            documents.extend(page_documents)
-
-        return documents
+        return self._extract_documents_from_page(soup)
 
     def _extract_pagination_links(self, soup) -> List[str]:
         """Extract pagination links from the page."""
@@ -162,12 +144,12 @@ class MOPAScraper(BaseScraper):
 
         return False
 
-    def fetch_document_content(self, url: str) -> Dict[str, any]:
+    def is_pdf(self, url: str) -> bool:
         """
-        Fetch a single document.
-        MOPA primarily serves PDFs, so this returns metadata only.
+        MOPA primarily serves PDFs, so every document returns metadata only
+        (see _fetch_pdf_content) and is downloaded as a PDF.
         """
-        return self._fetch_pdf_content(url)
+        return True
 
     def _fetch_pdf_content(self, url: str) -> Dict[str, any]:
         """
@@ -18,20 +18,13 @@ class SimpleScraper(BaseScraper):
         super().__init__(base_url)
         self.url_pattern = url_pattern
 
-    def fetch_document_links(self) -> List[Dict[str, str]]:
+    def parse_document_links(self, soup, page_url: str) -> List[Dict[str, str]]:
         """
-        Crawl the base URL and find all document links.
+        Find all document links on the index page.
         Returns list of dicts with url, title, and type.
         """
         documents = []
 
-        # Fetch the index page
-        html = self.fetch_page(self.base_url)
-        if not html:
-            return documents
-
-        soup = self.parse_html(html)
-
         # Find all links
         for link in soup.find_all('a', href=True):
             href = link['href']
@@ -70,22 +63,8 @@ class SimpleScraper(BaseScraper):
 
         return documents
 
-    def fetch_document_content(self, url: str) -> Dict[str, any]:
-        """
-        Fetch a single document and extract its content.
-        Returns a dict with title, text, and metadata.
-        """
-        if url.lower().endswith('.pdf'):
-            return self._fetch_pdf_content(url)
-        else:
-            return self._fetch_html_content(url)
-
-    def _fetch_html_content(self, url: str) -> Dict[str, any]:
+    def parse_document_content(self, url: str, html: str) -> Dict[str, any]:
         """Extract content from an HTML page."""
-        html = self.fetch_page(url)
-        if not html:
-            return None
-
         soup = self.parse_html(html)
 
         # Try to find the main content
@@ -125,16 +104,3 @@ class SimpleScraper(BaseScraper):
             'url': url,
             'type': 'html'
         }
-
-    def _fetch_pdf_content(self, url: str) -> Dict[str, any]:
-        """
-        Note: This method returns metadata only.
-        Actual PDF processing happens in the ingestion service
-        after downloading the file.
-        """
-        return {
-            'title': url.split('/')[-1].replace('.pdf', ''),
-            'url': url,
-            'type': 'pdf',
-            'text': None  # Will be extracted after download
-        }
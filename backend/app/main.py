@@ -1,7 +1,14 @@
+import time
+
+# Measure cold-start cost per worker: imports, app setup and startup hooks
+_started_at = time.perf_counter()
+
 from fastapi import FastAPI
+import asyncio
+import os
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.db.base import init_pgvector
+from app.db.base import init_pgvector, SessionLocal
 
 app = FastAPI(
     title="BdLens API",
@@ -24,6 +31,37 @@ async def startup_event():
     """Initialize services on startup."""
     init_pgvector()
 
+    app.state.startup_seconds = round(time.perf_counter() - _started_at, 3)
+    print(f"Worker {os.getpid()} started in {app.state.startup_seconds}s")
+
+    # Tag and entity IDs used by document processing
+    from app.services.id_cache import warm_id_caches
+    asyncio.create_task(asyncio.to_thread(warm_id_caches))
+
+    if settings.query_cache_warm_size > 0:
+        # Warm in the background so it doesn't delay startup
+        asyncio.create_task(warm_query_cache())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the crawler's shared connection pool."""
+    from app.ingestion.crawler import crawler
+    await crawler.close()
+
+
+async def warm_query_cache():
+    """Pre-embed the most popular search queries."""
+    from app.services.query_cache import query_embedding_cache
+
+    db = SessionLocal()
+    try:
+        await query_embedding_cache.warm(db, settings.query_cache_warm_size)
+    except Exception as e:
+        print(f"Error warming query embedding cache: {e}")
+    finally:
+        db.close()
+
 
 @app.get("/")
 async def root():
@@ -36,7 +74,13 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    from app.services import ai_provider
+
+    return {
+        "status": "healthy",
+        "startup_seconds": getattr(app.state, "startup_seconds", None),
+        "ai_init_seconds": ai_provider.init_seconds
+    }
 
 
 # Import and include routers
@@ -5,6 +5,10 @@ from app.models.tag import Tag, DocumentTag
 from app.models.entity import Entity, DocumentEntity
 from app.models.crawl_job import CrawlJob
 from app.models.analytics_event import AnalyticsEvent
+from app.models.ingestion_task import IngestionTask
+from app.models.document_lsh_band import DocumentLSHBand
+from app.models.pdf_extraction import PDFExtraction
+from app.models.document_url_alias import DocumentURLAlias
 
 __all__ = [
     "User",
@@ -17,4 +21,8 @@ __all__ = [
     "DocumentEntity",
     "CrawlJob",
     "AnalyticsEvent",
+    "IngestionTask",
+    "DocumentLSHBand",
+    "PDFExtraction",
+    "DocumentURLAlias",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -13,6 +13,9 @@ class CrawlJob(Base):
     started_at = Column(DateTime, nullable=True)
     finished_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
+    bytes_downloaded = Column(BigInteger, default=0, nullable=False)
+    bytes_saved = Column(BigInteger, default=0, nullable=False)  # Bodies not re-sent thanks to 304 responses
+    not_modified = Column(Integer, default=0, nullable=False)  # 304 responses
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
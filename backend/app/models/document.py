@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY, BIT
+from pgvector.sqlalchemy import Vector
 from datetime import datetime
 from app.db.base import Base
 
@@ -14,6 +16,12 @@ class Document(Base):
     original_file_path = Column(String, nullable=True)  # For uploaded PDFs
     content_text = Column(Text, nullable=False)
     content_type = Column(String, nullable=False)  # 'html' or 'pdf'
+    # SHA-256 of the normalized text; detects the same content under another URL or upload
+    content_hash = Column(String(64), nullable=True, index=True)
+    # MinHash signature of the text's word shingles (see services/near_duplicates.py)
+    minhash = Column(ARRAY(Integer), nullable=True)
+    # Earlier document this one nearly duplicates; its enrichment is reused
+    near_duplicate_of_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
     published_at = Column(DateTime, nullable=True)
     crawled_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     summary = Column(Text, nullable=True)
@@ -37,8 +45,18 @@ class DocumentSection(Base):
     order_index = Column(Integer, nullable=False)
     heading = Column(String, nullable=True)
     text = Column(Text, nullable=False)
-    # Vector embedding - using pgvector
-    # Will add this column in migration with: embedding = Column(Vector(768))
+    # SHA-256 of the normalized text; identical chunks share one embedding
+    chunk_hash = Column(String(64), nullable=True, index=True)
+    # Vector embedding - using pgvector (768 dimensions for Gemini embeddings)
+    embedding = Column(Vector(768), nullable=True)
+    # Sign-bit signature of the embedding, used for the fast first search pass
+    embedding_bits = Column(BIT(768), nullable=True)
+    # 'ready', 'pending' (awaiting backfill) or 'failed' (gave up after retries)
+    embedding_status = Column(String, default="pending", nullable=False, index=True)
+    embedding_attempts = Column(Integer, default=0, nullable=False)
+    # True when the embedding was copied from an identical chunk instead of generated
+    embedding_reused = Column(Boolean, default=False, nullable=False)
+    embedding_model = Column(String, nullable=True)  # Model that produced the embedding; reuse is per model
 
     # Relationships
     document = relationship("Document", back_populates="sections")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, ForeignKey, Index
+from app.db.base import Base
+
+
+class DocumentLSHBand(Base):
+    """One LSH band of a document's MinHash signature, used to find near-duplicate candidates."""
+    __tablename__ = "document_lsh_bands"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, nullable=False)  # Hash of the band's rows
+
+    __table_args__ = (Index("ix_document_lsh_bands_band_bucket", "band", "bucket"),)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from app.db.base import Base
+
+
+class DocumentURLAlias(Base):
+    """Another URL whose content exactly duplicates a stored document, so crawls skip it."""
+    __tablename__ = "document_url_aliases"
+
+    url = Column(String, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -19,5 +19,8 @@ class Entity(Base):
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)  # e.g., 'organization', 'location', 'person'
 
+    # Unique so entities can be upserted with ON CONFLICT (name, type)
+    __table_args__ = (Index("ix_entities_name_type", "name", "type", unique=True),)
+
     # Relationships
     documents = relationship("Document", secondary="document_entities", back_populates="entities")
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from datetime import datetime
+from app.db.base import Base
+
+
+class IngestionTask(Base):
+    """A unit of work for one stage of the ingestion pipeline (fetch, extract, chunk, embed, enrich)."""
+    __tablename__ = "ingestion_tasks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    stage = Column(String, nullable=False, index=True)
+    status = Column(String, default="pending", nullable=False, index=True)  # 'pending', 'running', 'done', 'failed', 'needs_ocr'
+    payload = Column(JSON, nullable=True)  # Stage input (url, file path, title, ...)
+    source_id = Column(Integer, ForeignKey("document_sources.id"), nullable=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=True, index=True)
+    crawl_job_id = Column(Integer, ForeignKey("crawl_jobs.id"), nullable=True, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Retry backoff
+    locked_at = Column(DateTime, nullable=True)
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
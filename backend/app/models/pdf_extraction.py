@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from datetime import datetime
+from app.db.base import Base
+
+
+class PDFExtraction(Base):
+    """Outcome and timing of one PDF text extraction; image-only files wait here for OCR."""
+    __tablename__ = "pdf_extractions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_id = Column(Integer, ForeignKey("document_sources.id"), nullable=True, index=True)
+    url = Column(String, nullable=True, index=True)
+    file_path = Column(String, nullable=True)
+    status = Column(String, nullable=False, index=True)  # 'ok', 'needs_ocr', 'failed'
+    extractor = Column(String, nullable=True)  # 'pdfplumber', 'pypdf2', 'ocr' (not extracted)
+    cached = Column(Boolean, default=False, nullable=False)  # Served from the extraction cache
+    text_layer = Column(Boolean, nullable=True)
+    font_count = Column(Integer, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    elapsed_ms = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
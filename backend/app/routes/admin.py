@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
 from datetime import datetime
+import asyncio
 import os
 import uuid
 
@@ -21,8 +22,19 @@ from app.schemas.admin import (
 )
 from app.schemas.document import DocumentDetail
 from app.auth.dependencies import get_current_admin_user
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import DocumentProcessor, known_url
+from app.services.pdf_extractor import NeedsOCR
+from app.services.rate_limiter import rate_limiter
+from app.services.ai_cache import ai_cache
+from app.services.query_cache import query_embedding_cache
+from app.services.embedding_backfill import EmbeddingBackfill, backfill_pending_embeddings
+from app.services import chunk_dedup, extraction_log, ingestion_pipeline
+from app.services.id_cache import tag_id_cache, entity_id_cache
+from app.services.extraction_cache import extraction_cache
 from app.ingestion import get_scraper_for_source
+from app.ingestion.crawler import crawler
+from app.ingestion.download import CHUNK_SIZE, FileTooLarge, StreamedFile
+from app.ingestion.http_cache import http_cache
 from app.config import settings
 
 router = APIRouter()
@@ -113,84 +125,106 @@ async def trigger_crawl(
 
         documents_created = 0
 
-        # Fetch document links
-        doc_links = scraper.fetch_document_links()
+        # Fetch document links (further listing pages are fetched concurrently)
+        doc_links = await crawler.fetch_document_links(scraper)
 
-        for doc_link in doc_links[:10]:  # Limit to 10 docs per crawl for free tier
-            try:
-                # Check if document already exists
-                existing = db.query(Document).filter(Document.url == doc_link['url']).first()
-                if existing:
+        if settings.ingestion_mode == "queued":
+            # Hand the documents to the pipeline workers; the last task to finish closes the job
+            queued = 0
+            for doc_link in doc_links[:10]:  # Limit to 10 docs per crawl for free tier
+                if known_url(db, doc_link['url']):
                     continue
+                ingestion_pipeline.enqueue(
+                    db, "fetch",
+                    {"url": doc_link['url'], "title": doc_link.get('title')},
+                    source_id=source_id,
+                    crawl_job_id=job.id
+                )
+                queued += 1
+
+            scraper.close()
+
+            if queued:
+                ingestion_pipeline.add_transfer(db, job.id, scraper.transfer)
+                db.commit()
+                db.refresh(job)
+                return job
+
+            doc_links = []
+
+        new_links = []
+        seen_urls = set()
+        for doc_link in doc_links[:10]:  # Limit to 10 docs per crawl for free tier
+            # Check if document already exists (or is a scan waiting for OCR)
+            if doc_link['url'] in seen_urls:
+                continue
+            seen_urls.add(doc_link['url'])
+            if known_url(db, doc_link['url']) or extraction_log.awaiting_ocr(db, doc_link['url']):
+                continue
+            new_links.append(doc_link)
 
-                # Fetch content
-                doc_data = scraper.fetch_document_content(doc_link['url'])
-
+        # Documents are fetched (and PDFs downloaded) concurrently and processed as they arrive
+        async for doc_link, doc_data in crawler.fetch_documents(scraper, new_links):
+            try:
                 if not doc_data:
                     continue
 
                 # Process PDF or HTML
                 if doc_data['type'] == 'pdf':
-                    # Download PDF
-                    upload_dir = settings.upload_dir
-                    os.makedirs(upload_dir, exist_ok=True)
-                    filename = f"{uuid.uuid4()}.pdf"
-                    file_path = os.path.join(upload_dir, filename)
-
-                    if scraper.fetch_pdf(doc_data['url'], file_path):
-                        processor.process_pdf_file(
-                            file_path=file_path,
+                    if doc_data.get('file_path'):
+                        document = await processor.process_pdf_file_async(
+                            file_path=doc_data['file_path'],
                             title=doc_data['title'],
                             source_id=source_id,
                             url=doc_data['url']
                         )
-                        documents_created += 1
+                        if _keep_if_created(document, doc_data['file_path']):
+                            documents_created += 1
 
                 else:  # HTML
                     if doc_data.get('text'):
-                        processor.process_text_document(
+                        document = await processor.process_text_document_async(
                             title=doc_data['title'],
                             content_text=doc_data['text'],
                             content_type='html',
                             url=doc_data['url'],
                             source_id=source_id
                         )
-                        documents_created += 1
+                        # A duplicate of another page's content comes back under its own URL
+                        if document.url == doc_data['url']:
+                            documents_created += 1
 
                         # Process any PDF attachments found in HTML content
-                        if doc_data.get('pdf_links'):
-                            for pdf_url in doc_data['pdf_links']:
-                                try:
-                                    # Check if PDF already exists
-                                    existing_pdf = db.query(Document).filter(Document.url == pdf_url).first()
-                                    if existing_pdf:
-                                        continue
-
-                                    # Download and process PDF
-                                    upload_dir = settings.upload_dir
-                                    os.makedirs(upload_dir, exist_ok=True)
-                                    filename = f"{uuid.uuid4()}.pdf"
-                                    file_path = os.path.join(upload_dir, filename)
-
-                                    if scraper.fetch_pdf(pdf_url, file_path):
-                                        processor.process_pdf_file(
-                                            file_path=file_path,
-                                            title=f"{doc_data['title']} - Attachment",
-                                            source_id=source_id,
-                                            url=pdf_url
-                                        )
+                        attachments = [
+                            {'url': pdf_url, 'title': f"{doc_data['title']} - Attachment", 'type': 'pdf'}
+                            for pdf_url in doc_data.get('pdf_links') or []
+                            if not known_url(db, pdf_url)
+                            and not extraction_log.awaiting_ocr(db, pdf_url)
+                        ]
+                        async for attachment, pdf_data in crawler.fetch_documents(scraper, attachments):
+                            try:
+                                if pdf_data and pdf_data.get('file_path'):
+                                    document = await processor.process_pdf_file_async(
+                                        file_path=pdf_data['file_path'],
+                                        title=attachment['title'],
+                                        source_id=source_id,
+                                        url=attachment['url']
+                                    )
+                                    if _keep_if_created(document, pdf_data['file_path']):
                                         documents_created += 1
-                                except Exception as pdf_error:
-                                    print(f"Error processing PDF attachment {pdf_url}: {pdf_error}")
-                                    continue
+                            except Exception as pdf_error:
+                                print(f"Error processing PDF attachment {attachment['url']}: {pdf_error}")
+                                continue
 
             except Exception as e:
                 print(f"Error processing document {doc_link['url']}: {e}")
                 continue
 
         scraper.close()
+        print(f"Crawl job {job.id}: {documents_created} new documents")
 
         # Update job status
+        ingestion_pipeline.add_transfer(db, job.id, scraper.transfer)
         job.status = "success"
         job.finished_at = datetime.utcnow()
         source.last_crawled_at = datetime.utcnow()
@@ -248,27 +282,180 @@ async def upload_document(
     filename = f"{uuid.uuid4()}_{file.filename}"
     file_path = os.path.join(upload_dir, filename)
 
-    with open(file_path, 'wb') as f:
-        content = await file.read()
-        f.write(content)
+    # Stream to a temp file in chunks; renamed into place once complete
+    upload = StreamedFile(file_path)
+    try:
+        upload.open()
+        while chunk := await file.read(CHUNK_SIZE):
+            upload.write(chunk)
+        upload.finish()
+    except FileTooLarge as e:
+        upload.discard()
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        upload.discard()
+        raise
 
     # Process PDF
     processor = DocumentProcessor(db)
 
     try:
-        document = processor.process_pdf_file(
-            file_path=file_path,
-            title=title or file.filename,
-            source_id=source_id
-        )
-        return document
-
+        if settings.ingestion_mode == "queued":
+            # Extract now so the document can be returned; AI work goes to the workers
+            document, created = await asyncio.to_thread(
+                processor.extract_stage,
+                title=title or file.filename,
+                content_type="pdf",
+                source_id=source_id,
+                file_path=file_path
+            )
+            if created:
+                ingestion_pipeline.enqueue_document_stages(db, document)
+            db.commit()
+            db.refresh(document)
+        else:
+            document = await processor.process_pdf_file_async(
+                file_path=file_path,
+                title=title or file.filename,
+                source_id=source_id
+            )
+
+    except NeedsOCR as e:
+        # Keep the file: it is listed under /ingestion/needs-ocr
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         # Clean up file on error
         if os.path.exists(file_path):
             os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
+    # Re-upload of an existing document: keep the original file only
+    _keep_if_created(document, file_path)
+
+    return document
+
+
+def _keep_if_created(document: Document, file_path: str) -> bool:
+    """
+    Whether processing the file created the document. For a duplicate, the
+    existing document keeps its own file and the new download is removed.
+    """
+    if document.original_file_path == file_path:
+        return True
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    return False
+
+
+# ===== AI SERVICES =====
+
+@router.get("/ai/rate-limits")
+async def get_rate_limit_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get AI rate limiter wait-time statistics per operation."""
+    return rate_limiter.stats()
+
+
+@router.get("/ai/cache")
+async def get_ai_cache_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get AI response and query embedding cache hit/miss statistics."""
+    return {
+        "responses": ai_cache.stats(),
+        "queries": query_embedding_cache.stats()
+    }
+
+
+@router.post("/embeddings/backfill")
+async def trigger_embedding_backfill(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Re-embed sections whose embedding failed or was deferred, in the background."""
+    pending = EmbeddingBackfill(db).pending_count()
+    if pending:
+        background_tasks.add_task(backfill_pending_embeddings)
+    return {"pending": pending}
+
+
+@router.get("/embeddings/dedup")
+async def get_embedding_dedup_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get per-source share of section embeddings reused from identical chunks."""
+    return chunk_dedup.source_stats(db)
+
+
+@router.get("/ingestion/tasks")
+async def get_ingestion_task_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get ingestion pipeline task counts per stage and status."""
+    return ingestion_pipeline.stage_counts(db)
+
+
+@router.get("/ingestion/id-cache")
+async def get_id_cache_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get tag and entity ID cache hit/miss statistics."""
+    return {
+        "tags": tag_id_cache.stats(),
+        "entities": entity_id_cache.stats()
+    }
+
+
+@router.get("/ingestion/crawler")
+async def get_crawler_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get async crawler request counts, politeness wait time and HTTP validator cache statistics."""
+    return {
+        **crawler.stats(),
+        "http_cache": http_cache.stats()
+    }
+
+
+@router.get("/ingestion/extraction-times")
+async def get_extraction_times(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get PDF extraction time per source, slowest first, with needs-OCR counts."""
+    return extraction_log.source_stats(db)
+
+
+@router.get("/ingestion/needs-ocr")
+async def list_needs_ocr(
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """List PDFs without a text layer that are waiting for OCR."""
+    return extraction_log.needs_ocr(db, limit)
+
+
+@router.get("/ingestion/extraction-cache")
+async def get_extraction_cache_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get PDF extraction cache hit/miss statistics and size."""
+    return extraction_cache.stats()
+
+
+@router.post("/ingestion/extraction-cache/prune")
+async def prune_extraction_cache(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Drop cached extractions older than the age limit and enforce the size limit."""
+    removed = extraction_cache.prune()
+    return {"removed": removed, **extraction_cache.stats()}
+
 
 # ===== ANALYTICS =====
 
@@ -1,6 +1,5 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from typing import List, Optional
 
 from app.db.base import get_db
@@ -9,7 +8,8 @@ from app.models.analytics_event import AnalyticsEvent
 from app.models.document import DocumentSection, Document
 from app.schemas.document import SearchResult
 from app.auth.dependencies import get_current_user
-from app.services.ai_provider import ai_provider
+from app.services.query_cache import query_embedding_cache
+from app.services.vector_search import search_sections
 
 router = APIRouter()
 
@@ -37,82 +37,20 @@ async def search_documents(
     db.add(event)
     db.commit()
 
-    # Generate query embedding
-    query_embedding = ai_provider.embed_query(q)
+    # Generate query embedding (cached, with concurrent identical queries coalesced)
+    query_embedding = await query_embedding_cache.get_embedding(q)
+    if query_embedding is None:
+        raise HTTPException(status_code=503, detail="Search is temporarily unavailable")
 
-    # Convert embedding to PostgreSQL vector format
-    embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-
-    # Build base query for similarity search
-    # Using cosine distance (1 - cosine_similarity)
-    similarity_query = text("""
-        SELECT
-            ds.id as section_id,
-            ds.document_id,
-            ds.text as snippet,
-            d.title,
-            d.url,
-            d.source_id,
-            1 - (ds.embedding <=> :query_embedding::vector) as score
-        FROM document_sections ds
-        JOIN documents d ON ds.document_id = d.id
-        WHERE ds.embedding IS NOT NULL
-    """)
-
-    # Add filters if provided
-    if tag:
-        from app.models.tag import Tag
-        tag_obj = db.query(Tag).filter(Tag.slug == tag).first()
-        if tag_obj:
-            similarity_query = text("""
-                SELECT
-                    ds.id as section_id,
-                    ds.document_id,
-                    ds.text as snippet,
-                    d.title,
-                    d.url,
-                    d.source_id,
-                    1 - (ds.embedding <=> :query_embedding::vector) as score
-                FROM document_sections ds
-                JOIN documents d ON ds.document_id = d.id
-                JOIN document_tags dt ON d.id = dt.document_id
-                WHERE ds.embedding IS NOT NULL
-                AND dt.tag_id = :tag_id
-            """)
-
-    if source_id:
-        similarity_query = text("""
-            SELECT
-                ds.id as section_id,
-                ds.document_id,
-                ds.text as snippet,
-                d.title,
-                d.url,
-                d.source_id,
-                1 - (ds.embedding <=> :query_embedding::vector) as score
-            FROM document_sections ds
-            JOIN documents d ON ds.document_id = d.id
-            WHERE ds.embedding IS NOT NULL
-            AND d.source_id = :source_id
-        """)
-
-    # Add ordering and limit
-    final_query = text(str(similarity_query) + """
-        ORDER BY score DESC
-        LIMIT :limit
-    """)
-
-    # Execute query
-    params = {"query_embedding": embedding_str, "limit": limit}
+    # Resolve tag filter
+    tag_id = None
     if tag:
         from app.models.tag import Tag
         tag_obj = db.query(Tag).filter(Tag.slug == tag).first()
         if tag_obj:
-            params["tag_id"] = tag_obj.id
-    if source_id:
-        params["source_id"] = source_id
+            tag_id = tag_obj.id
 
-    results = db.execute(final_query, params).fetchall()
+    results = search_sections(db, query_embedding, limit, tag_id=tag_id, source_id=source_id)
 
     # Format results
     search_results = []
@@ -40,6 +40,9 @@ class CrawlJobResponse(BaseModel):
     started_at: Optional[datetime]
     finished_at: Optional[datetime]
     error_message: Optional[str]
+    bytes_downloaded: int = 0
+    bytes_saved: int = 0
+    not_modified: int = 0
     created_at: datetime
 
     class Config:
@@ -0,0 +1,190 @@
+"""
+AI backends used by AIProvider.
+GeminiBackend calls the Google Gemini API; LocalBackend is a deterministic
+offline stand-in for load testing and profiling without network or quota.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.config import settings
+
+EMBEDDING_DIM = 768  # Matches the Vector(768) column on document_sections
+
+TAG_CATEGORIES = [
+    "housing", "transportation", "education", "health", "environment", "safety",
+    "budget", "planning", "zoning", "infrastructure", "utilities", "parks",
+    "community", "business", "legal", "employment", "taxes", "elections",
+    "public-services",
+]
+
+
+class AIBackend(ABC):
+    """Interface for text generation and embedding backends."""
+
+    text_model: str
+    embedding_model: str
+    rate_limited: bool = True  # Whether calls count against the API quota
+
+    @abstractmethod
+    def generate(self, prompt: str, task_type: str, text: str) -> str:
+        """
+        Generate a response for a prompt.
+        task_type names the operation (summary, explanation, tags, entities,
+        enrichment) and text is the source document the prompt was built from.
+        """
+        pass
+
+    @abstractmethod
+    def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """Embed texts in one request. task_type is retrieval_document or retrieval_query."""
+        pass
+
+    async def generate_async(self, prompt: str, task_type: str, text: str) -> str:
+        """Async variant of generate. Defaults to running generate in a worker thread."""
+        return await asyncio.to_thread(self.generate, prompt, task_type, text)
+
+    async def embed_async(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """Async variant of embed. Defaults to running embed in a worker thread."""
+        return await asyncio.to_thread(self.embed, texts, task_type)
+
+
+class GeminiBackend(AIBackend):
+    """Google Gemini API backend."""
+
+    text_model = "gemini-pro"
+    embedding_model = "models/embedding-001"  # Gemini embedding model
+
+    def __init__(self, api_key: str):
+        # The SDK pulls in grpc and protobuf, so import it only when the backend is built
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model = genai.GenerativeModel(self.text_model)
+
+    def generate(self, prompt: str, task_type: str, text: str) -> str:
+        response = self.model.generate_content(prompt)
+        return response.text
+
+    async def generate_async(self, prompt: str, task_type: str, text: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        result = self.genai.embed_content(
+            model=self.embedding_model,
+            content=texts,
+            task_type=task_type
+        )
+        return result['embedding']
+
+
+class LocalBackend(AIBackend):
+    """
+    Deterministic offline backend.
+    Embeddings use the hashing trick over word unigrams and bigrams, projected
+    to 768 dimensions and L2-normalized; generated text comes from templates.
+    """
+
+    text_model = "local-template"
+    embedding_model = "local-hashing-768"
+    rate_limited = False
+
+    SENTENCE_END = re.compile(r'(?<=[.!?।])\s+')
+    WORD = re.compile(r'\w+')
+    ACRONYM = re.compile(r'\b[A-Z]{2,6}\b')
+
+    def generate(self, prompt: str, task_type: str, text: str) -> str:
+        if task_type == "summary":
+            return self._summary(text)
+        if task_type == "explanation":
+            return self._explanation(text)
+        if task_type == "tags":
+            return json.dumps(self._tags(text))
+        if task_type == "entities":
+            return json.dumps(self._entities(text))
+        if task_type == "enrichment":
+            return json.dumps({
+                "summary": self._summary(text),
+                "explanation": self._explanation(text),
+                "tags": self._tags(text),
+                "entities": self._entities(text),
+            }, ensure_ascii=False)
+        raise ValueError(f"Unsupported task type: {task_type}")
+
+    async def generate_async(self, prompt: str, task_type: str, text: str) -> str:
+        return self.generate(prompt, task_type, text)
+
+    def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    async def embed_async(self, texts: List[str], task_type: str) -> List[List[float]]:
+        return self.embed(texts, task_type)
+
+    def _sentences(self, text: str) -> List[str]:
+        return [s.strip() for s in self.SENTENCE_END.split(" ".join(text.split())) if s.strip()]
+
+    def _summary(self, text: str) -> str:
+        sentences = self._sentences(text[:4000])
+        return " ".join(sentences[:3]) or "No content."
+
+    def _explanation(self, text: str) -> str:
+        sentences = self._sentences(text[:4000])
+        points = "\n".join(f"- {sentence}" for sentence in sentences[:6])
+        return f"This document contains {len(text.split())} words. Key points:\n{points}"
+
+    def _tags(self, text: str) -> List[str]:
+        lowered = text[:3000].lower()
+        tags = [tag for tag in TAG_CATEGORIES if tag.replace("-", " ") in lowered]
+        return tags[:5] or ["public-services"]
+
+    def _entities(self, text: str) -> List[dict]:
+        names = sorted(set(self.ACRONYM.findall(text[:3000])))
+        return [{"name": name, "type": "organization"} for name in names[:10]]
+
+    def _embed_one(self, text: str) -> List[float]:
+        words = self.WORD.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+        vector = [0.0] * EMBEDDING_DIM
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % EMBEDDING_DIM] += sign
+
+        norm = math.sqrt(sum(x * x for x in vector))
+        if norm == 0:
+            # Empty text still gets a usable (non-zero) vector
+            vector[0] = 1.0
+            return vector
+        return [x / norm for x in vector]
+
+
+def embedding_model() -> str:
+    """Embedding model of the backend selected by settings.ai_backend, without creating it."""
+    backend = settings.ai_backend.lower()
+
+    if backend == "local":
+        return LocalBackend.embedding_model
+    elif backend == "gemini":
+        return GeminiBackend.embedding_model
+
+    raise ValueError(f"Unknown AI backend: {settings.ai_backend}")
+
+
+def create_backend() -> AIBackend:
+    """Create the backend selected by settings.ai_backend."""
+    backend = settings.ai_backend.lower()
+
+    if backend == "local":
+        return LocalBackend()
+    elif backend == "gemini":
+        return GeminiBackend(settings.gemini_api_key)
+
+    raise ValueError(f"Unknown AI backend: {settings.ai_backend}")
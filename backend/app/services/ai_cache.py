@@ -0,0 +1,179 @@
+"""
+Persistent cache for AI responses.
+Content-addressed by hash(model, task type, prompt/text) and stored in a local
+SQLite file, with size-based LRU eviction and hit/miss counters.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache for generated text and embeddings."""
+
+    def __init__(self, path: str, max_bytes: int, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, task_type: str, content: str) -> str:
+        """Build the content-addressed cache key."""
+        digest = hashlib.sha256()
+        for part in (model, task_type, content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite database on first use. Must be called with the lock held."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ai_responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ai_responses_last_access ON ai_responses (last_access)"
+            )
+            conn.commit()
+
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM ai_responses"
+            ).fetchone()[0]
+            self._conn = conn
+
+        return self._conn
+
+    def get(self, model: str, task_type: str, content: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(model, task_type, content)
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value FROM ai_responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                conn.execute(
+                    "UPDATE ai_responses SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+                conn.commit()
+                self.hits += 1
+
+            return json.loads(row[0])
+        except Exception as e:
+            print(f"Error reading AI response cache: {e}")
+            return None
+
+    def set(self, model: str, task_type: str, content: str, value: Any):
+        """
+        Store a successful response.
+        Callers must never pass failure placeholders (error strings, zero vectors).
+        """
+        if not self.enabled:
+            return
+
+        key = self.make_key(model, task_type, content)
+
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+            size = len(payload.encode("utf-8"))
+
+            with self._lock:
+                conn = self._connect()
+                previous = conn.execute(
+                    "SELECT size FROM ai_responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO ai_responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, size, time.time())
+                )
+                self._total_bytes += size - (previous[0] if previous else 0)
+
+                if self._total_bytes > self.max_bytes:
+                    self._evict(conn)
+
+                conn.commit()
+        except Exception as e:
+            print(f"Error writing AI response cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until the cache is back under 90% of its limit."""
+        target = int(self.max_bytes * 0.9)
+
+        # Other worker processes share the file, so recount before evicting
+        self._total_bytes = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM ai_responses"
+        ).fetchone()[0]
+
+        while self._total_bytes > target:
+            rows = conn.execute(
+                "SELECT key, size FROM ai_responses ORDER BY last_access LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+
+            freed = []
+            for key, size in rows:
+                if self._total_bytes <= target:
+                    break
+                freed.append((key,))
+                self._total_bytes -= size
+
+            conn.executemany("DELETE FROM ai_responses WHERE key = ?", freed)
+            self.evictions += len(freed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Singleton instance
+ai_cache = ResponseCache(
+    path=settings.ai_cache_path,
+    max_bytes=settings.ai_cache_max_mb * 1024 * 1024,
+    enabled=settings.ai_cache_enabled
+)
@@ -1,55 +1,208 @@
 """
-AI Provider service using Google Gemini API.
+AI Provider service.
 Handles all AI operations: summaries, explanations, tagging, entity extraction, and embeddings.
+The backend (Gemini or offline local) is selected with settings.ai_backend.
 """
-import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import json
+import threading
 import time
 from app.config import settings
+from app.services.rate_limiter import rate_limiter, RateLimiter
+from app.services.ai_cache import ai_cache
+from app.services.ai_backends import AIBackend, create_backend
 
-# Configure Gemini API
-genai.configure(api_key=settings.gemini_api_key)
+EMBEDDING_MAX_CHARS = 1000  # Truncate text to avoid token limits
+EMBEDDING_MAX_BATCH_SIZE = 100  # Gemini batchEmbedContents limit
 
-# Models
-TEXT_MODEL = "gemini-pro"
-EMBEDDING_MODEL = "models/embedding-001"  # Gemini embedding model
 
-# Rate limiting
-RATE_LIMIT_DELAY = 1  # seconds between API calls
+# ===== PROMPTS =====
+
+def _summary_prompt(text: str) -> str:
+    return f"""Summarize the following government document in 2-3 clear sentences that a regular citizen can understand. Focus on what the document is about and why it matters to the community.
+
+Document:
+{text[:4000]}
+
+Summary:"""
+
+
+def _explanation_prompt(text: str) -> str:
+    return f"""Provide a detailed but accessible explanation of this government document. Break down the key points, explain any technical or legal terms, and describe the practical implications for citizens. Write in plain language that anyone can understand.
+
+Document:
+{text[:4000]}
+
+Explanation:"""
+
+
+def _tags_prompt(text: str) -> str:
+    return f"""Analyze this government document and identify the most relevant topic categories. Choose from the following categories (select 1-5 that apply):
+
+Categories: housing, transportation, education, health, environment, safety, budget, planning, zoning, infrastructure, utilities, parks, community, business, legal, employment, taxes, elections, public-services
+
+Return ONLY a JSON array of applicable categories, nothing else.
+
+Document:
+{text[:3000]}
+
+Tags (JSON array):"""
+
+
+def _entities_prompt(text: str) -> str:
+    return f"""Extract important named entities from this government document. Identify organizations, locations, people, and other key entities.
+
+Return ONLY a JSON array of objects with "name" and "type" fields, where type is one of: organization, location, person, event, law
+
+Document:
+{text[:3000]}
+
+Entities (JSON array):"""
+
+
+def _enrichment_prompt(text: str) -> str:
+    return f"""Analyze the following government document for regular citizens. Return ONLY a JSON object with these fields:
+
+- "summary": 2-3 clear sentences that a regular citizen can understand, focusing on what the document is about and why it matters to the community.
+- "explanation": a detailed but accessible explanation in plain language. Break down the key points, explain any technical or legal terms, and describe the practical implications for citizens.
+- "tags": a JSON array of 1-5 applicable topic categories chosen from: housing, transportation, education, health, environment, safety, budget, planning, zoning, infrastructure, utilities, parks, community, business, legal, employment, taxes, elections, public-services
+- "entities": a JSON array of important named entities, as objects with "name" and "type" fields, where type is one of: organization, location, person, event, law
+
+Document:
+{text[:4000]}
+
+JSON object:"""
+
+
+ENRICHMENT_FIELDS = ("summary", "explanation", "tags", "entities")
+
+
+def _validate_enrichment(data: Any) -> Dict[str, Any]:
+    """
+    Validate a combined enrichment response.
+    Returns only the fields that are present and well-formed.
+    """
+    if not isinstance(data, dict):
+        return {}
+
+    valid = {}
+
+    for field in ("summary", "explanation"):
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            valid[field] = value.strip()
+
+    tags = data.get("tags")
+    if isinstance(tags, list):
+        tags = [tag.strip() for tag in tags if isinstance(tag, str) and tag.strip()]
+        if tags:
+            valid["tags"] = tags
+
+    entities = data.get("entities")
+    if isinstance(entities, list):
+        valid["entities"] = [
+            {"name": entity["name"], "type": entity.get("type") or "unknown"}
+            for entity in entities
+            if isinstance(entity, dict) and isinstance(entity.get("name"), str)
+        ]
+
+    return valid
+
+
+def _parse_json(result_text: str) -> Any:
+    """Parse a JSON value from a model response, stripping markdown code fences."""
+    result_text = result_text.strip()
+
+    # Clean up response to extract JSON
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+
+    return json.loads(result_text)
+
+
+def _parse_text(result_text: str) -> str:
+    """Return a stripped text response, rejecting empty ones."""
+    result_text = result_text.strip()
+    if not result_text:
+        raise ValueError("Empty response")
+    return result_text
+
+
+def _parse_list(result_text: str) -> list:
+    """Parse a JSON array from a model response."""
+    value = _parse_json(result_text)
+    if not isinstance(value, list):
+        raise ValueError("Expected a JSON array")
+    return value
+
+
+def _cached_embeddings(model: str, texts: List[str]) -> List[Optional[List[float]]]:
+    """Look up document embeddings in the response cache. Misses are None."""
+    return [
+        ai_cache.get(model, "retrieval_document", text[:EMBEDDING_MAX_CHARS])
+        for text in texts
+    ]
+
+
+def _store_embeddings(model: str, texts: List[str], embeddings: List[Optional[List[float]]]):
+    """Cache successfully generated document embeddings."""
+    for text, embedding in zip(texts, embeddings):
+        if embedding is not None:
+            ai_cache.set(model, "retrieval_document", text[:EMBEDDING_MAX_CHARS], embedding)
+
+
+def _batches(texts: List[str]) -> List[List[str]]:
+    """Split texts into truncated batches for the batch embedding endpoint."""
+    batch_size = max(1, min(settings.embedding_batch_size, EMBEDDING_MAX_BATCH_SIZE))
+    return [
+        [text[:EMBEDDING_MAX_CHARS] for text in texts[start:start + batch_size]]
+        for start in range(0, len(texts), batch_size)
+    ]
+
+
+def _checked_batch(batch: List[str], embeddings: List[List[float]]) -> List[List[float]]:
+    """Reject a batch response without one embedding per text; they are matched up by position."""
+    if len(embeddings) != len(batch):
+        raise ValueError(f"Expected {len(batch)} embeddings, got {len(embeddings)}")
+    return embeddings
 
 
 class AIProvider:
     """Centralized AI provider for all AI operations."""
 
-    def __init__(self):
-        self.text_model = genai.GenerativeModel(TEXT_MODEL)
-        self.last_call_time = 0
+    def __init__(self, backend: Optional[AIBackend] = None):
+        self.backend = backend or create_backend()
 
-    def _rate_limit(self):
-        """Simple rate limiting to avoid hitting API limits."""
-        elapsed = time.time() - self.last_call_time
-        if elapsed < RATE_LIMIT_DELAY:
-            time.sleep(RATE_LIMIT_DELAY - elapsed)
-        self.last_call_time = time.time()
+    def _rate_limit(self, operation: str = RateLimiter.GENERATE):
+        """Wait for the per-operation quota before calling the API."""
+        if self.backend.rate_limited:
+            rate_limiter.acquire(operation)
 
-    def generate_summary(self, text: str) -> str:
+    def _generate(self, task_type: str, text: str, prompt: str, parse) -> Any:
         """
-        Generate a short, plain-language summary of the document.
-        Target: 2-3 sentences for general public understanding.
+        Generate and parse a response, serving it from the cache when possible.
+        Only successfully parsed responses are cached. Raises on failure.
         """
-        self._rate_limit()
+        cached = ai_cache.get(self.backend.text_model, task_type, prompt)
+        if cached is not None:
+            return cached
 
-        prompt = f"""Summarize the following government document in 2-3 clear sentences that a regular citizen can understand. Focus on what the document is about and why it matters to the community.
-
-Document:
-{text[:4000]}
+        self._rate_limit()
+        value = parse(self.backend.generate(prompt, task_type, text))
 
-Summary:"""
+        ai_cache.set(self.backend.text_model, task_type, prompt, value)
+        return value
 
+    def generate_summary(self, text: str) -> str:
+        """
+        Generate a short, plain-language summary of the document.
+        Target: 2-3 sentences for general public understanding.
+        """
         try:
-            response = self.text_model.generate_content(prompt)
-            return response.text.strip()
+            return self._generate("summary", text, _summary_prompt(text), _parse_text)
         except Exception as e:
             print(f"Error generating summary: {e}")
             return "Summary generation failed."
@@ -59,18 +212,8 @@ Summary:"""
         Generate a longer, more detailed explanation.
         Target: A few paragraphs explaining the document in plain language.
         """
-        self._rate_limit()
-
-        prompt = f"""Provide a detailed but accessible explanation of this government document. Break down the key points, explain any technical or legal terms, and describe the practical implications for citizens. Write in plain language that anyone can understand.
-
-Document:
-{text[:4000]}
-
-Explanation:"""
-
         try:
-            response = self.text_model.generate_content(prompt)
-            return response.text.strip()
+            return self._generate("explanation", text, _explanation_prompt(text), _parse_text)
         except Exception as e:
             print(f"Error generating explanation: {e}")
             return "Explanation generation failed."
@@ -80,111 +223,339 @@ Explanation:"""
         Classify the document into relevant topic tags.
         Returns a list of tags like ["housing", "transportation", "education", etc.]
         """
-        self._rate_limit()
+        try:
+            return self._generate("tags", text, _tags_prompt(text), _parse_list)
+        except Exception as e:
+            print(f"Error classifying tags: {e}")
+            return ["uncategorized"]
 
-        prompt = f"""Analyze this government document and identify the most relevant topic categories. Choose from the following categories (select 1-5 that apply):
+    def extract_entities(self, text: str) -> List[Dict[str, str]]:
+        """
+        Extract named entities from the document.
+        Returns a list of dicts with 'name' and 'type' keys.
+        Types: organization, location, person, date, etc.
+        """
+        try:
+            return self._generate("entities", text, _entities_prompt(text), _parse_list)
+        except Exception as e:
+            print(f"Error extracting entities: {e}")
+            return []
 
-Categories: housing, transportation, education, health, environment, safety, budget, planning, zoning, infrastructure, utilities, parks, community, business, legal, employment, taxes, elections, public-services
+    def enrich_document(self, text: str) -> Dict[str, Any]:
+        """
+        Generate summary, explanation, tags and entities with a single API call.
+        Fields missing or malformed in the combined response are filled in
+        with the individual calls.
+        Returns a dict with 'summary', 'explanation', 'tags' and 'entities' keys.
+        """
+        prompt = _enrichment_prompt(text)
+        result = ai_cache.get(self.backend.text_model, "enrichment", prompt) or {}
+
+        if not result:
+            self._rate_limit()
+
+            try:
+                response_text = self.backend.generate(prompt, "enrichment", text)
+                result = _validate_enrichment(_parse_json(response_text))
+            except Exception as e:
+                print(f"Error generating combined enrichment: {e}")
+                result = {}
+
+            # Partial responses are not cached; their gaps are filled below
+            if all(field in result for field in ENRICHMENT_FIELDS):
+                ai_cache.set(self.backend.text_model, "enrichment", prompt, result)
+
+        fallbacks = {
+            "summary": self.generate_summary,
+            "explanation": self.generate_explanation,
+            "tags": self.classify_tags,
+            "entities": self.extract_entities,
+        }
+        for field in ENRICHMENT_FIELDS:
+            if field not in result:
+                result[field] = fallbacks[field](text)
+
+        return result
+
+    def embed_text(self, text: str) -> Optional[List[float]]:
+        """
+        Generate embedding vector for text using the backend's embedding model.
+        Returns a list of floats (768 dimensions), or None on failure.
+        """
+        embedding = _cached_embeddings(self.backend.embedding_model, [text])[0]
+        if embedding is not None:
+            return embedding
 
-Return ONLY a JSON array of applicable categories, nothing else.
+        self._rate_limit(RateLimiter.EMBED)
 
-Document:
-{text[:3000]}
+        embedding = self._embed_document(text)
+        if embedding is None:
+            # No zero-vector fallback: it would poison cosine similarity
+            return None
 
-Tags (JSON array):"""
+        _store_embeddings(self.backend.embedding_model, [text], [embedding])
+        return embedding
+
+    def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate embedding vectors for many texts using batched requests.
+        Returns one entry per input text, in order. Entries are None for
+        texts that could not be embedded.
+        """
+        model = self.backend.embedding_model
+        results = _cached_embeddings(model, texts)
+        missing = [i for i, embedding in enumerate(results) if embedding is None]
+        missing_texts = [texts[i] for i in missing]
 
+        embeddings: List[Optional[List[float]]] = []
+
+        for batch in _batches(missing_texts):
+            self._rate_limit(RateLimiter.EMBED)
+
+            try:
+                embeddings.extend(_checked_batch(batch, self.backend.embed(batch, "retrieval_document")))
+            except Exception as e:
+                print(f"Error generating batch embeddings, retrying individually: {e}")
+                # One bad chunk should not sink the whole batch
+                for text in batch:
+                    self._rate_limit(RateLimiter.EMBED)
+                    embeddings.append(self._embed_document(text))
+
+        _store_embeddings(model, missing_texts, embeddings)
+        for i, embedding in zip(missing, embeddings):
+            results[i] = embedding
+
+        return results
+
+    def _embed_document(self, text: str) -> Optional[List[float]]:
+        """Embed a single document chunk, returning None on failure."""
         try:
-            response = self.text_model.generate_content(prompt)
-            result_text = response.text.strip()
+            return self.backend.embed([text[:EMBEDDING_MAX_CHARS]], "retrieval_document")[0]
+        except Exception as e:
+            print(f"Error generating embedding: {e}")
+            return None
+
+    def embed_query(self, query: str) -> Optional[List[float]]:
+        """
+        Generate embedding vector for a search query.
+        Uses a different task_type optimized for queries.
+        Returns None on failure.
+        """
+        cached = ai_cache.get(self.backend.embedding_model, "retrieval_query", query)
+        if cached is not None:
+            return cached
 
-            # Clean up response to extract JSON
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
+        self._rate_limit(RateLimiter.EMBED)
 
-            tags = json.loads(result_text)
-            return tags if isinstance(tags, list) else []
+        try:
+            embedding = self.backend.embed([query], "retrieval_query")[0]
         except Exception as e:
-            print(f"Error classifying tags: {e}")
-            return ["uncategorized"]
+            print(f"Error generating query embedding: {e}")
+            return None
 
-    def extract_entities(self, text: str) -> List[Dict[str, str]]:
+        ai_cache.set(self.backend.embedding_model, "retrieval_query", query, embedding)
+        return embedding
+
+
+class AsyncAIProvider:
+    """
+    Asyncio variant of AIProvider.
+
+    Shares the process-wide rate limiter and response cache with AIProvider and
+    caps the number of in-flight API calls, so independent operations can be
+    awaited concurrently.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[AIBackend] = None,
+        max_concurrency: int = settings.ai_max_concurrency
+    ):
+        self.backend = backend or create_backend()
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _rate_limit(self, operation: str = RateLimiter.GENERATE):
+        """Await the per-operation quota before calling the API."""
+        if self.backend.rate_limited:
+            await rate_limiter.acquire_async(operation)
+
+    async def _generate_raw(self, task_type: str, text: str, prompt: str) -> str:
+        """Run a text generation call under the rate and concurrency budget."""
+        await self._rate_limit()
+        async with self._semaphore:
+            return await self.backend.generate_async(prompt, task_type, text)
+
+    async def _generate(self, task_type: str, text: str, prompt: str, parse) -> Any:
         """
-        Extract named entities from the document.
-        Returns a list of dicts with 'name' and 'type' keys.
-        Types: organization, location, person, date, etc.
+        Generate and parse a response, serving it from the cache when possible.
+        Only successfully parsed responses are cached. Raises on failure.
         """
-        self._rate_limit()
+        cached = ai_cache.get(self.backend.text_model, task_type, prompt)
+        if cached is not None:
+            return cached
 
-        prompt = f"""Extract important named entities from this government document. Identify organizations, locations, people, and other key entities.
+        value = parse(await self._generate_raw(task_type, text, prompt))
 
-Return ONLY a JSON array of objects with "name" and "type" fields, where type is one of: organization, location, person, event, law
+        ai_cache.set(self.backend.text_model, task_type, prompt, value)
+        return value
 
-Document:
-{text[:3000]}
+    async def _embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """Run an embedding call under the rate and concurrency budget."""
+        await self._rate_limit(RateLimiter.EMBED)
+        async with self._semaphore:
+            return await self.backend.embed_async(texts, task_type)
 
-Entities (JSON array):"""
+    async def generate_summary(self, text: str) -> str:
+        """Generate a short, plain-language summary of the document."""
+        try:
+            return await self._generate("summary", text, _summary_prompt(text), _parse_text)
+        except Exception as e:
+            print(f"Error generating summary: {e}")
+            return "Summary generation failed."
 
+    async def generate_explanation(self, text: str) -> str:
+        """Generate a longer, more detailed explanation."""
         try:
-            response = self.text_model.generate_content(prompt)
-            result_text = response.text.strip()
+            return await self._generate("explanation", text, _explanation_prompt(text), _parse_text)
+        except Exception as e:
+            print(f"Error generating explanation: {e}")
+            return "Explanation generation failed."
 
-            # Clean up response to extract JSON
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
+    async def classify_tags(self, text: str) -> List[str]:
+        """Classify the document into relevant topic tags."""
+        try:
+            return await self._generate("tags", text, _tags_prompt(text), _parse_list)
+        except Exception as e:
+            print(f"Error classifying tags: {e}")
+            return ["uncategorized"]
 
-            entities = json.loads(result_text)
-            return entities if isinstance(entities, list) else []
+    async def extract_entities(self, text: str) -> List[Dict[str, str]]:
+        """Extract named entities from the document."""
+        try:
+            return await self._generate("entities", text, _entities_prompt(text), _parse_list)
         except Exception as e:
             print(f"Error extracting entities: {e}")
             return []
 
-    def embed_text(self, text: str) -> List[float]:
+    async def enrich_document(self, text: str) -> Dict[str, Any]:
         """
-        Generate embedding vector for text using Gemini embedding model.
-        Returns a list of floats (768 dimensions).
+        Generate summary, explanation, tags and entities with a single API call.
+        Fields missing or malformed in the combined response are filled in
+        concurrently with the individual calls.
         """
-        self._rate_limit()
+        prompt = _enrichment_prompt(text)
+        result = ai_cache.get(self.backend.text_model, "enrichment", prompt) or {}
+
+        if not result:
+            try:
+                response_text = await self._generate_raw("enrichment", text, prompt)
+                result = _validate_enrichment(_parse_json(response_text))
+            except Exception as e:
+                print(f"Error generating combined enrichment: {e}")
+                result = {}
+
+            # Partial responses are not cached; their gaps are filled below
+            if all(field in result for field in ENRICHMENT_FIELDS):
+                ai_cache.set(self.backend.text_model, "enrichment", prompt, result)
+
+        fallbacks = {
+            "summary": self.generate_summary,
+            "explanation": self.generate_explanation,
+            "tags": self.classify_tags,
+            "entities": self.extract_entities,
+        }
+        missing = [field for field in ENRICHMENT_FIELDS if field not in result]
+        values = await asyncio.gather(*(fallbacks[field](text) for field in missing))
+        result.update(zip(missing, values))
+
+        return result
+
+    async def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate embedding vectors for many texts, with batches sent concurrently.
+        Entries are None for texts that could not be embedded.
+        """
+        model = self.backend.embedding_model
+        results = _cached_embeddings(model, texts)
+        missing = [i for i, embedding in enumerate(results) if embedding is None]
+        missing_texts = [texts[i] for i in missing]
 
-        try:
-            # Truncate text to avoid token limits (embedding models have limits)
-            truncated_text = text[:1000]
+        batch_results = await asyncio.gather(
+            *(self._embed_batch(batch) for batch in _batches(missing_texts))
+        )
+        embeddings = [embedding for batch_result in batch_results for embedding in batch_result]
+
+        _store_embeddings(model, missing_texts, embeddings)
+        for i, embedding in zip(missing, embeddings):
+            results[i] = embedding
 
-            result = genai.embed_content(
-                model=EMBEDDING_MODEL,
-                content=truncated_text,
-                task_type="retrieval_document"
-            )
+        return results
 
-            return result['embedding']
+    async def _embed_batch(self, batch: List[str]) -> List[Optional[List[float]]]:
+        """Embed one batch, retrying items individually if the batch fails."""
+        try:
+            return _checked_batch(batch, await self._embed(batch, "retrieval_document"))
+        except Exception as e:
+            print(f"Error generating batch embeddings, retrying individually: {e}")
+            return list(await asyncio.gather(*(self._embed_document(text) for text in batch)))
+
+    async def _embed_document(self, text: str) -> Optional[List[float]]:
+        """Embed a single document chunk, returning None on failure."""
+        try:
+            return (await self._embed([text[:EMBEDDING_MAX_CHARS]], "retrieval_document"))[0]
         except Exception as e:
             print(f"Error generating embedding: {e}")
-            # Return zero vector as fallback
-            return [0.0] * 768
+            return None
 
-    def embed_query(self, query: str) -> List[float]:
-        """
-        Generate embedding vector for a search query.
-        Uses a different task_type optimized for queries.
-        """
-        self._rate_limit()
+    async def embed_query(self, query: str) -> Optional[List[float]]:
+        """Generate embedding vector for a search query. Returns None on failure."""
+        cached = ai_cache.get(self.backend.embedding_model, "retrieval_query", query)
+        if cached is not None:
+            return cached
 
         try:
-            result = genai.embed_content(
-                model=EMBEDDING_MODEL,
-                content=query,
-                task_type="retrieval_query"
-            )
-
-            return result['embedding']
+            embedding = (await self._embed([query], "retrieval_query"))[0]
         except Exception as e:
             print(f"Error generating query embedding: {e}")
-            # Return zero vector as fallback
-            return [0.0] * 768
+            return None
+
+        ai_cache.set(self.backend.embedding_model, "retrieval_query", query, embedding)
+        return embedding
+
+
+# Singleton instances (sharing one backend), built on first use so that importing
+# this module doesn't load the AI SDK or configure API clients
+_ai_provider: Optional[AIProvider] = None
+_async_ai_provider: Optional[AsyncAIProvider] = None
+_init_lock = threading.Lock()
+init_seconds: Optional[float] = None
+
+
+def _init_providers():
+    """Create the shared backend and both providers. Must be called with the lock held."""
+    global _ai_provider, _async_ai_provider, init_seconds
+
+    started = time.perf_counter()
+    _ai_provider = AIProvider()
+    _async_ai_provider = AsyncAIProvider(_ai_provider.backend)
+    init_seconds = round(time.perf_counter() - started, 3)
+
+    print(f"AI provider ({settings.ai_backend}) initialized in {init_seconds}s")
+
+
+def get_ai_provider() -> AIProvider:
+    """Return the shared AIProvider, creating it on first use."""
+    if _ai_provider is None:
+        with _init_lock:
+            if _ai_provider is None:
+                _init_providers()
+    return _ai_provider
 
 
-# Singleton instance
-ai_provider = AIProvider()
+def get_async_ai_provider() -> AsyncAIProvider:
+    """Return the shared AsyncAIProvider, creating it on first use."""
+    if _async_ai_provider is None:
+        with _init_lock:
+            if _async_ai_provider is None:
+                _init_providers()
+    return _async_ai_provider
@@ -0,0 +1,111 @@
+"""
+Bulk persistence for document sections, tags, entities and their links.
+Each helper issues a single statement per document instead of one
+SELECT/INSERT round trip per item.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from typing import Dict, List, Optional, Tuple
+
+from app.models.document import DocumentSection
+from app.models.tag import Tag, DocumentTag
+from app.models.entity import Entity, DocumentEntity
+from app.services.ai_backends import embedding_model
+from app.services.chunker import Chunk, content_hash
+from app.services.vector_search import binary_signature
+
+
+def insert_sections(
+    db: Session,
+    document_id: int,
+    chunks: List[Chunk],
+    embeddings: List[Optional[List[float]]],
+    attempted: bool = True,
+    hashes: Optional[List[str]] = None,
+    reused: Optional[List[bool]] = None
+):
+    """
+    Insert all sections of a document in one multi-row INSERT.
+    Chunks without an embedding are stored as NULL and left pending for backfill.
+    reused marks embeddings copied from an identical chunk (see chunk_dedup).
+    """
+    if hashes is None:
+        hashes = [content_hash(chunk.text) for chunk in chunks]
+    if reused is None:
+        reused = [False] * len(chunks)
+    model = embedding_model()
+
+    rows = [
+        {
+            "document_id": document_id,
+            "order_index": order_index,
+            "heading": chunk.heading,
+            "text": chunk.text,
+            "chunk_hash": hashes[order_index],
+            "embedding": embedding,
+            "embedding_bits": binary_signature(embedding) if embedding is not None else None,
+            "embedding_status": "ready" if embedding is not None else "pending",
+            "embedding_attempts": 1 if attempted else 0,
+            "embedding_reused": reused[order_index],
+            "embedding_model": model if embedding is not None else None,
+        }
+        for order_index, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    ]
+
+    if rows:
+        db.execute(insert(DocumentSection), rows)
+
+
+def upsert_tags(db: Session, tags: Dict[str, str]) -> Dict[str, int]:
+    """
+    Insert missing tags and return the IDs of all of them.
+    Takes {slug: name}; returns {slug: id}.
+    """
+    if not tags:
+        return {}
+
+    stmt = insert(Tag).values([{"slug": slug, "name": name} for slug, name in tags.items()])
+    # A no-op update (rather than DO NOTHING) makes existing rows come back in RETURNING
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Tag.slug],
+        set_={"slug": stmt.excluded.slug}
+    ).returning(Tag.id, Tag.slug)
+
+    return {row.slug: row.id for row in db.execute(stmt)}
+
+
+def upsert_entities(db: Session, entities: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """
+    Insert missing entities and return the IDs of all of them.
+    Takes unique (name, type) pairs; returns {(name, type): id}.
+    """
+    if not entities:
+        return {}
+
+    stmt = insert(Entity).values([{"name": name, "type": entity_type} for name, entity_type in entities])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Entity.name, Entity.type],
+        set_={"name": stmt.excluded.name}
+    ).returning(Entity.id, Entity.name, Entity.type)
+
+    return {(row.name, row.type): row.id for row in db.execute(stmt)}
+
+
+def link_tags(db: Session, document_id: int, tag_ids: List[int]):
+    """Attach tags to a document, ignoring links that already exist."""
+    if tag_ids:
+        db.execute(
+            insert(DocumentTag).values(
+                [{"document_id": document_id, "tag_id": tag_id} for tag_id in tag_ids]
+            ).on_conflict_do_nothing()
+        )
+
+
+def link_entities(db: Session, document_id: int, entity_ids: List[int]):
+    """Attach entities to a document, ignoring links that already exist."""
+    if entity_ids:
+        db.execute(
+            insert(DocumentEntity).values(
+                [{"document_id": document_id, "entity_id": entity_id} for entity_id in entity_ids]
+            ).on_conflict_do_nothing()
+        )
@@ -0,0 +1,82 @@
+"""
+Cross-document reuse of section embeddings.
+Sections store a hash of their normalized text (chunk_hash). A new chunk whose
+hash matches a section that already has an embedding reuses that vector
+instead of calling the embedding API: letterheads, signature blocks and
+standard legal text are embedded once. Only embeddings from the current
+backend's embedding model are reused, so switching AI_BACKEND never mixes
+vectors from different models.
+"""
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+
+from app.models.document import Document, DocumentSection
+from app.models.document_source import DocumentSource
+from app.services.ai_backends import embedding_model
+
+
+def find_embeddings(db: Session, hashes: List[str]) -> Dict[str, List[float]]:
+    """Return stored embeddings from the current embedding model for the chunk hashes that have one."""
+    unique = list(set(hashes))
+    if not unique:
+        return {}
+
+    rows = db.query(
+        DocumentSection.chunk_hash, DocumentSection.embedding
+    ).filter(
+        DocumentSection.chunk_hash.in_(unique),
+        DocumentSection.embedding_status == "ready",
+        DocumentSection.embedding_model == embedding_model()
+    ).distinct(DocumentSection.chunk_hash).all()
+
+    return {row.chunk_hash: [float(x) for x in row.embedding] for row in rows}
+
+
+def missing_texts(texts: List[str], hashes: List[str], embeddings: List[Optional[List[float]]]) -> Dict[str, str]:
+    """Texts still needing an embedding, one per unique hash, as {hash: text}."""
+    missing = {}
+    for text, text_hash, embedding in zip(texts, hashes, embeddings):
+        if embedding is None:
+            missing.setdefault(text_hash, text)
+    return missing
+
+
+def fill(embeddings: List[Optional[List[float]]], hashes: List[str], new: Dict[str, Optional[List[float]]]):
+    """Fill gaps in embeddings in place from {hash: embedding}."""
+    for index, text_hash in enumerate(hashes):
+        if embeddings[index] is None:
+            embeddings[index] = new.get(text_hash)
+
+
+def source_stats(db: Session) -> List[Dict[str, Any]]:
+    """Share of sections per source whose embedding was reused rather than generated."""
+    reused = func.sum(case((DocumentSection.embedding_reused, 1), else_=0))
+
+    rows = db.query(
+        Document.source_id,
+        DocumentSource.name,
+        func.count(DocumentSection.id).label("sections"),
+        reused.label("reused")
+    ).join(
+        Document, DocumentSection.document_id == Document.id
+    ).outerjoin(
+        DocumentSource, Document.source_id == DocumentSource.id
+    ).filter(
+        DocumentSection.chunk_hash.isnot(None)
+    ).group_by(
+        Document.source_id, DocumentSource.name
+    ).order_by(
+        reused.desc()
+    ).all()
+
+    return [
+        {
+            "source_id": row.source_id,
+            "source_name": row.name,
+            "sections": row.sections,
+            "reused": int(row.reused or 0),
+            "hit_rate": round((row.reused or 0) / row.sections, 3) if row.sections else 0.0,
+        }
+        for row in rows
+    ]
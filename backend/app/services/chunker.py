@@ -0,0 +1,299 @@
+"""
+Structure-aware text chunker.
+Splits text at heading, paragraph and sentence boundaries (English and Bangla),
+packs sentences into chunks under a token and character budget and drops
+page-break noise. The character cap keeps every chunk within the text that
+is embedded (EMBEDDING_MAX_CHARS), so no chunk's tail is cut off.
+Each chunk's text starts with its heading, so the heading is embedded with it.
+Works as a generator, so pages can be chunked as they are extracted.
+"""
+import hashlib
+import re
+import unicodedata
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from app.config import settings
+from app.services.ai_provider import EMBEDDING_MAX_CHARS
+
+# Sentence ends: English punctuation and the Bangla dari (।) / double dari (॥)
+SENTENCE_END = re.compile(r'(?<=[.!?।॥])\s+')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n|\f')
+# Bengali vowel signs and virama aren't \w, so the whole block counts as word characters
+TOKEN = re.compile(r'[\w\u0980-\u09FF]+|[^\w\s]')
+# Counting unit: runs longer than LONG_WORD_CHARS (URLs, hashes, unbroken OCR text) count per piece
+LONG_WORD_CHARS = 32
+TOKEN_PIECE = re.compile(r'[\w\u0980-\u09FF]{1,%d}|[^\w\s]' % LONG_WORD_CHARS)
+LETTER = re.compile(r'[^\W\d_]')
+PAGE_MARKER = re.compile(r'^(page|পৃষ্ঠা)\s*\d+(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+TERMINAL_PUNCTUATION = ".!?।॥,;"
+
+HEADING_MAX_TOKENS = 12
+HEADING_MAX_CHARS = 100
+
+
+class Chunk(NamedTuple):
+    heading: Optional[str]
+    text: str
+
+
+def content_hash(text: str) -> str:
+    """
+    SHA-256 of the text after Unicode (NFKC), case and whitespace normalization,
+    so re-extracted or re-formatted copies of a text hash the same.
+    """
+    normalized = " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (words and punctuation marks), script-agnostic."""
+    return len(TOKEN_PIECE.findall(text))
+
+
+def is_noise(text: str) -> bool:
+    """True for blocks with no letters (page numbers, rules) or bare page markers."""
+    text = text.strip()
+    return not LETTER.search(text) or bool(PAGE_MARKER.match(text))
+
+
+def is_heading(line: str) -> bool:
+    """A short line with letters and no sentence-ending punctuation."""
+    line = line.strip()
+    return (
+        0 < len(line) <= HEADING_MAX_CHARS
+        and line[-1] not in TERMINAL_PUNCTUATION
+        and count_tokens(line) <= HEADING_MAX_TOKENS
+        and bool(LETTER.search(line))
+    )
+
+
+def _page_blocks(pages: Iterable[str]) -> Iterator[tuple]:
+    """
+    Yield (lines, may_have_heading) for each non-noise block of the pages.
+    A page's last block that stops mid-sentence continues on the next page,
+    so it is joined with that page's first block instead of standing alone.
+    """
+    carry = None  # (lines, may_have_heading) of an unfinished block from the previous page
+
+    for page in pages:
+        blocks = []
+        for block in PARAGRAPH_BREAK.split(page):
+            lines = [line.strip() for line in block.splitlines() if line.strip()]
+            if lines and not is_noise(" ".join(lines)):
+                blocks.append((lines, True))
+        if not blocks:
+            continue
+
+        if carry is not None:
+            # A lone fragment from the previous page is the start of a sentence, not a heading
+            lines, may_have_heading = carry
+            blocks[0] = (lines + blocks[0][0], may_have_heading and len(lines) > 1)
+
+        carry = blocks.pop() if blocks[-1][0][-1][-1] not in TERMINAL_PUNCTUATION else None
+        yield from blocks
+
+    if carry is not None:
+        yield carry
+
+
+def iter_blocks(pages: Iterable[str]) -> Iterator[tuple]:
+    """
+    Yield ('heading', text) and ('paragraph', text) blocks from pages of text.
+    A short line is a heading only when body text follows it; otherwise it is
+    kept as a paragraph. Line wraps inside a paragraph are joined; noise
+    blocks are skipped.
+    """
+    pending = None  # A one-line block: a heading if a paragraph comes next
+
+    for lines, may_have_heading in _page_blocks(pages):
+        if len(lines) == 1 and may_have_heading and is_heading(lines[0]):
+            if pending is not None:
+                yield "paragraph", pending
+            pending = lines[0]
+            continue
+
+        heading = None
+        if len(lines) > 1 and may_have_heading and is_heading(lines[0]) and not is_noise(" ".join(lines[1:])):
+            heading, lines = lines[0], lines[1:]
+
+        if pending is not None:
+            # Followed by another heading, the pending line is content of its own
+            yield ("paragraph" if heading else "heading"), pending
+            pending = None
+        if heading:
+            yield "heading", heading
+        yield "paragraph", " ".join(lines)
+
+    if pending is not None:
+        yield "paragraph", pending
+
+
+def split_sentences(paragraph: str, max_tokens: int, max_chars: Optional[int] = None) -> Iterator[str]:
+    """
+    Split a paragraph into sentences; sentences over max_tokens (or max_chars)
+    are split by words, and single words over the limits are cut into pieces.
+    """
+    if max_chars is None:
+        max_chars = len(paragraph)
+
+    for sentence in SENTENCE_END.split(paragraph):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+
+        if count_tokens(sentence) <= max_tokens and len(sentence) <= max_chars:
+            yield sentence
+            continue
+
+        words = []
+        size = 0
+        length = -1  # Characters joined so far, less the first separator
+        for word in sentence.split():
+            for piece in _split_word(word, max_tokens, max_chars):
+                piece_tokens = count_tokens(piece)
+                if words and (size + piece_tokens > max_tokens or length + 1 + len(piece) > max_chars):
+                    yield " ".join(words)
+                    words, size, length = [], 0, -1
+                words.append(piece)
+                size += piece_tokens
+                length += 1 + len(piece)
+        if words:
+            yield " ".join(words)
+
+
+def _split_word(word: str, max_tokens: int, max_chars: int) -> Iterator[str]:
+    """Cut a word over max_tokens tokens or max_chars characters into consecutive pieces that fit."""
+    if count_tokens(word) <= max_tokens and len(word) <= max_chars:
+        yield word
+        return
+
+    # A word has no whitespace, so its token pieces concatenate back to it exactly
+    piece = ""
+    tokens = 0
+    for part in TOKEN_PIECE.findall(word):
+        if piece and (tokens + 1 > max_tokens or len(piece) + len(part) > max_chars):
+            yield piece
+            piece, tokens = "", 0
+        piece += part
+        tokens += 1
+    if piece:
+        yield piece
+
+
+def _render(heading: Optional[str], sentences: List[tuple]) -> str:
+    """
+    Join (sentence, starts_paragraph) pairs under the heading, keeping paragraph
+    breaks. The heading is always set off from the body by a paragraph break,
+    even when the chunk starts mid-paragraph.
+    """
+    parts = [heading] if heading else []
+    for index, (sentence, starts_paragraph) in enumerate(sentences):
+        if parts:
+            parts.append("\n\n" if starts_paragraph or index == 0 else " ")
+        parts.append(sentence)
+    return "".join(parts)
+
+
+def _pack(
+    pages: Iterable[str],
+    max_tokens: int,
+    max_chars: int,
+    overlap_sentences: int
+) -> Iterator[tuple]:
+    """
+    Pack sentences into (heading, sentences, carried) groups under max_tokens
+    and, once rendered, max_chars. carried is the number of leading sentences
+    repeated from the previous group.
+    """
+    heading = None
+    budget = max_tokens  # Room left beside the heading, which is embedded with every chunk
+    char_budget = max_chars
+    sentences: List[tuple] = []  # (sentence, starts_paragraph)
+    size = 0
+    length = 0  # Characters, counting a two-character separator per sentence
+    carried = 0
+
+    for kind, block in iter_blocks(pages):
+        if kind == "heading":
+            # Content stays under its own heading, however small
+            if len(sentences) > carried:
+                yield heading, sentences, carried
+            sentences, size, length, carried = [], 0, 0, 0
+            heading = block
+            budget = max(max_tokens - count_tokens(heading), max_tokens // 2)
+            char_budget = max(max_chars - len(heading) - 2, max_chars // 2)
+            continue
+
+        starts_paragraph = True
+        for sentence in split_sentences(block, budget, char_budget - 2):
+            sentence_tokens = count_tokens(sentence)
+            sentence_chars = len(sentence) + 2
+
+            if sentences and (size + sentence_tokens > budget or length + sentence_chars > char_budget):
+                yield heading, sentences, carried
+
+                # Repeat the last sentences for context, if they leave room
+                overlap = sentences[-overlap_sentences:] if overlap_sentences else []
+                size = sum(count_tokens(s) for s, _ in overlap)
+                length = sum(len(s) + 2 for s, _ in overlap)
+                if size + sentence_tokens > budget or length + sentence_chars > char_budget:
+                    overlap, size, length = [], 0, 0
+                sentences = [(s, index == 0) for index, (s, _) in enumerate(overlap)]
+                carried = len(sentences)
+
+            sentences.append((sentence, starts_paragraph))
+            size += sentence_tokens
+            length += sentence_chars
+            starts_paragraph = False
+
+    if len(sentences) > carried:
+        yield heading, sentences, carried
+
+
+def chunk_text(
+    text: Union[str, Iterable[str]],
+    max_tokens: Optional[int] = None,
+    min_tokens: Optional[int] = None,
+    overlap_sentences: Optional[int] = None,
+    max_chars: Optional[int] = None
+) -> Iterator[Chunk]:
+    """
+    Yield chunks of at most max_tokens and max_chars, each tagged with its
+    nearest heading, which also starts the chunk text. Chunks never span
+    headings; within a section, consecutive chunks share overlap_sentences
+    sentences. A trailing piece under min_tokens is merged into the chunk
+    before it (which may then exceed max_tokens slightly, but not max_chars)
+    instead of being embedded on its own. max_chars is capped at
+    EMBEDDING_MAX_CHARS. Accepts a string or an iterable of page strings.
+    """
+    if max_tokens is None:
+        max_tokens = settings.chunk_max_tokens
+    if min_tokens is None:
+        min_tokens = settings.chunk_min_tokens
+    if overlap_sentences is None:
+        overlap_sentences = settings.chunk_overlap_sentences
+    max_chars = min(max_chars or settings.chunk_max_chars, EMBEDDING_MAX_CHARS)
+
+    pages = [text] if isinstance(text, str) else text
+
+    # Hold one group back so a small tail can be merged into it
+    previous = None
+    for group in _pack(pages, max_tokens, max_chars, overlap_sentences):
+        heading, sentences, carried = group
+        new_sentences = sentences[carried:]
+
+        if (
+            previous is not None
+            and previous[0] == heading
+            and sum(count_tokens(s) for s, _ in new_sentences) < min_tokens
+            and len(_render(heading, previous[1] + new_sentences)) <= max_chars
+        ):
+            previous = (heading, previous[1] + new_sentences, previous[2])
+            continue
+
+        if previous is not None:
+            yield Chunk(previous[0], _render(previous[0], previous[1]))
+        previous = group
+
+    if previous is not None:
+        yield Chunk(previous[0], _render(previous[0], previous[1]))
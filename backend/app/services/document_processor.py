@@ -2,16 +2,23 @@
 Document processing service.
 Coordinates PDF extraction, AI analysis, and database storage.
 """
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from typing import List, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional
+import asyncio
 import os
+import time
 from datetime import datetime
 
-from app.models.document import Document, DocumentSection
-from app.models.tag import Tag
-from app.models.entity import Entity
-from app.services.ai_provider import ai_provider
-from app.services.pdf_extractor import pdf_extractor
+from app.config import settings
+from app.models.document import Document
+from app.models.document_url_alias import DocumentURLAlias
+from app.services import bulk_store
+from app.services import chunk_dedup, extraction_log, near_duplicates
+from app.services.chunker import Chunk, chunk_text, content_hash
+from app.services.id_cache import tag_id_cache, entity_id_cache, cache_after_commit
+from app.services.ai_provider import get_ai_provider, get_async_ai_provider
+from app.services.pdf_extractor import NeedsOCR, pdf_extractor
 
 
 def slugify(text: str) -> str:
@@ -23,6 +30,14 @@ def slugify(text: str) -> str:
     return text
 
 
+def known_url(db: Session, url: str) -> bool:
+    """Whether a document was stored from this URL, or the URL's content duplicated one."""
+    return (
+        db.query(Document.id).filter(Document.url == url).first() is not None
+        or db.query(DocumentURLAlias.url).filter(DocumentURLAlias.url == url).first() is not None
+    )
+
+
 class DocumentProcessor:
     """Process and enrich documents with AI analysis."""
 
@@ -41,45 +56,20 @@ class DocumentProcessor:
         """
         Process a text document (HTML or extracted PDF text).
         Creates document, sections, generates AI summaries/tags/entities/embeddings.
+        If a document with the same content already exists, it is returned instead.
         """
+        text_hash = content_hash(content_text)
+        duplicate = self.find_duplicate(text_hash, url)
+        if duplicate:
+            self.db.commit()
+            return duplicate
 
-        # Create the document record
-        document = Document(
-            title=title,
-            content_text=content_text,
-            content_type=content_type,
-            url=url,
-            source_id=source_id,
-            original_file_path=file_path,
-            crawled_at=datetime.utcnow()
-        )
-
-        self.db.add(document)
-        self.db.flush()  # Get document ID
+        document = self._create_document(title, content_text, content_type, url, source_id, file_path, text_hash)
 
-        # Generate AI content
+        # Generate AI content (or reuse a near-duplicate's)
         try:
-            # Summary and explanation
-            document.summary = ai_provider.generate_summary(content_text)
-            document.explanation = ai_provider.generate_explanation(content_text)
-
-            # Tags
-            tag_names = ai_provider.classify_tags(content_text)
-            for tag_name in tag_names:
-                tag = self._get_or_create_tag(tag_name)
-                if tag not in document.tags:
-                    document.tags.append(tag)
-
-            # Entities
-            entities_data = ai_provider.extract_entities(content_text)
-            for entity_data in entities_data:
-                entity = self._get_or_create_entity(
-                    entity_data.get('name', ''),
-                    entity_data.get('type', 'unknown')
-                )
-                if entity and entity not in document.entities:
-                    document.entities.append(entity)
-
+            if not self._reuse_enrichment(document):
+                self._apply_enrichment(document, self._enrich(content_text))
         except Exception as e:
             print(f"Error in AI processing: {e}")
 
@@ -91,6 +81,75 @@ class DocumentProcessor:
 
         return document
 
+    async def process_text_document_async(
+        self,
+        title: str,
+        content_text: str,
+        content_type: str = "html",
+        url: Optional[str] = None,
+        source_id: Optional[int] = None,
+        file_path: Optional[str] = None
+    ) -> Document:
+        """
+        Async variant of process_text_document.
+        Summary, explanation, tags, entities and section embeddings are independent,
+        so they run concurrently under the shared AI rate and concurrency budget.
+        """
+        chunks = self._split_chunks(content_text)
+
+        return await self._store_document_async(
+            title, content_text, content_type, url, source_id, file_path, chunks
+        )
+
+    async def _store_document_async(
+        self,
+        title: str,
+        content_text: str,
+        content_type: str,
+        url: Optional[str],
+        source_id: Optional[int],
+        file_path: Optional[str],
+        chunks: List[Chunk],
+        batches: Optional[List[asyncio.Future]] = None
+    ) -> Document:
+        """
+        Create the document, enrich it and store its sections.
+        batches are embedding tasks already started for consecutive runs of chunks
+        (see process_pdf_file_async); otherwise chunks are embedded here,
+        concurrently with enrichment. Duplicates cancel any started batches.
+        """
+        text_hash = content_hash(content_text)
+        duplicate = self.find_duplicate(text_hash, url)
+        if duplicate:
+            for task in batches or []:
+                task.cancel()
+            self.db.commit()
+            return duplicate
+
+        if batches is None:
+            batches = [asyncio.ensure_future(self._embed_all_async(chunks))]
+
+        document = self._create_document(title, content_text, content_type, url, source_id, file_path, text_hash)
+        reused_enrichment = self._reuse_enrichment(document)
+
+        enrichment, (hashes, embeddings, reused) = await asyncio.gather(
+            self._enrich_async(content_text) if not reused_enrichment else asyncio.sleep(0),
+            self._merge_batches(batches)
+        )
+
+        try:
+            if enrichment:
+                self._apply_enrichment(document, enrichment)
+        except Exception as e:
+            print(f"Error in AI processing: {e}")
+
+        self._add_sections(document, chunks, embeddings, not settings.defer_embeddings, hashes, reused)
+
+        self.db.commit()
+        self.db.refresh(document)
+
+        return document
+
     def process_pdf_file(
         self,
         file_path: str,
@@ -101,27 +160,329 @@ class DocumentProcessor:
         """
         Process a PDF file: extract text, analyze with AI, store in database.
         """
+        content_text, title = self._extract_pdf(file_path, title, url, source_id)
 
-        # Extract text
-        content_text = pdf_extractor.extract_text(file_path)
+        # Process as text document
+        return self.process_text_document(
+            title=title,
+            content_text=content_text,
+            content_type="pdf",
+            url=url,
+            source_id=source_id,
+            file_path=file_path
+        )
 
-        if not content_text or not content_text.strip():
-            raise ValueError("Could not extract text from PDF")
+    async def process_pdf_file_async(
+        self,
+        file_path: str,
+        title: Optional[str] = None,
+        source_id: Optional[int] = None,
+        url: Optional[str] = None
+    ) -> Document:
+        """
+        Async variant of process_pdf_file.
+        Pages are extracted one at a time in a worker thread and chunked as they
+        arrive; each full batch of chunks is embedded while extraction continues.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        page_texts: List[str] = []
+        metadata: Dict[str, Any] = {}
+        timing: Dict[str, float] = {}
+
+        def collect(pages: Iterator[tuple]) -> Iterator[str]:
+            for _, text in pages:
+                if text:
+                    page_texts.append(text)
+                yield text
+
+        def produce():
+            # One open (or a cached extraction) serves metadata and every page
+            started = time.perf_counter()
+            try:
+                with pdf_extractor.stream(file_path) as (pdf_metadata, pages):
+                    metadata.update(pdf_metadata)
+                    for chunk in chunk_text(collect(pages)):
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            finally:
+                # Includes chunking, which is small next to extraction
+                timing["elapsed"] = time.perf_counter() - started
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        producer = asyncio.ensure_future(asyncio.to_thread(produce))
+
+        chunks: List[Chunk] = []
+        batches = []
+        batch: List[Chunk] = []
+        while (chunk := await queue.get()) is not None:
+            chunks.append(chunk)
+            batch.append(chunk)
+            if len(batch) >= settings.embedding_batch_size:
+                batches.append(asyncio.ensure_future(self._embed_all_async(batch)))
+                batch = []
+        if batch:
+            batches.append(asyncio.ensure_future(self._embed_all_async(batch)))
+
+        try:
+            await producer
+        except Exception:
+            for task in batches:
+                task.cancel()
+            raise
+
+        content_text = "\n\n".join(page_texts)
+        metadata["num_pages"] = metadata.get("num_pages") or len(page_texts)
+        try:
+            self._check_extraction(file_path, url, source_id, content_text, metadata, timing["elapsed"])
+        except ValueError:
+            for task in batches:
+                task.cancel()
+            raise
 
-        # Get title from metadata if not provided
         if not title:
-            metadata = pdf_extractor.get_metadata(file_path)
             title = metadata.get('title') or os.path.basename(file_path)
 
-        # Process as text document
-        return self.process_text_document(
+        return await self._store_document_async(
+            title, content_text, "pdf", url, source_id, file_path, chunks, batches
+        )
+
+    @staticmethod
+    async def _merge_batches(batches: List[asyncio.Future]) -> tuple:
+        """Concatenate (hashes, embeddings, reused) results of embedding batches."""
+        hashes, embeddings, reused = [], [], []
+        for batch_hashes, batch_embeddings, batch_reused in await asyncio.gather(*batches):
+            hashes.extend(batch_hashes)
+            embeddings.extend(batch_embeddings)
+            reused.extend(batch_reused)
+        return hashes, embeddings, reused
+
+    # ===== PIPELINE STAGES =====
+    # Used by the queued ingestion pipeline. Stages flush but don't commit, so the
+    # caller can commit a stage's output together with its follow-up tasks.
+
+    def extract_stage(
+        self,
+        title: Optional[str],
+        content_text: Optional[str] = None,
+        content_type: str = "html",
+        url: Optional[str] = None,
+        source_id: Optional[int] = None,
+        file_path: Optional[str] = None
+    ) -> tuple:
+        """
+        Extract stage: create the document record from text or a downloaded PDF.
+        No AI work happens here. Returns (document, created); created is False
+        when the content duplicates an existing document, which is returned instead.
+        """
+        if content_text is None:
+            content_text, title = self._extract_pdf(file_path, title, url, source_id)
+
+        text_hash = content_hash(content_text)
+        duplicate = self.find_duplicate(text_hash, url)
+        if duplicate:
+            return duplicate, False
+
+        document = self._create_document(title, content_text, content_type, url, source_id, file_path, text_hash)
+        return document, True
+
+    def chunk_stage(self, document: Document) -> int:
+        """
+        Chunk stage: split the document into sections left pending for the embed stage.
+        Returns the number of sections. Safe to retry.
+        """
+        if document.sections:
+            return len(document.sections)
+
+        chunks = self._split_chunks(document.content_text)
+        self._add_sections(document, chunks, [None] * len(chunks), attempted=False)
+        self.db.flush()
+
+        return len(chunks)
+
+    def enrich_stage(self, document: Document):
+        """Enrich stage: generate summary, explanation, tags and entities (or reuse a near-duplicate's)."""
+        if not self._reuse_enrichment(document):
+            self._apply_enrichment(document, self._enrich(document.content_text))
+        document.updated_at = datetime.utcnow()
+        self.db.flush()
+
+    def _extract_pdf(
+        self,
+        file_path: str,
+        title: Optional[str],
+        url: Optional[str] = None,
+        source_id: Optional[int] = None
+    ) -> tuple:
+        """Extract text from a PDF and resolve its title. Returns (content_text, title)."""
+        # Text and metadata in a single pass over the file
+        started = time.perf_counter()
+        extracted = pdf_extractor.extract(file_path)
+        content_text = extracted.text
+
+        self._check_extraction(
+            file_path, url, source_id, content_text, extracted.metadata, time.perf_counter() - started
+        )
+
+        # Get title from metadata if not provided
+        if not title:
+            title = extracted.metadata.get('title') or os.path.basename(file_path)
+
+        return content_text, title
+
+    @staticmethod
+    def _check_extraction(
+        file_path: str,
+        url: Optional[str],
+        source_id: Optional[int],
+        content_text: str,
+        metadata: Dict[str, Any],
+        elapsed: float
+    ):
+        """
+        Log the extraction's timing and outcome, and reject files without text:
+        NeedsOCR for files that have pages (scans), ValueError for unreadable ones.
+        """
+        if content_text and content_text.strip():
+            status = "ok"
+        elif metadata.get("num_pages"):
+            status = "needs_ocr"
+        else:
+            status = "failed"
+
+        extraction_log.record(file_path, url, source_id, metadata, elapsed, status)
+
+        if status == "needs_ocr":
+            raise NeedsOCR(f"PDF has {metadata['num_pages']} pages but no text layer; queued for OCR")
+        if status == "failed":
+            raise ValueError("Could not extract text from PDF")
+
+    def find_duplicate(self, text_hash: str, url: Optional[str] = None) -> Optional[Document]:
+        """
+        Return the earliest document with the given content hash, if any.
+        The duplicate's url is recorded as an alias of that document (see
+        known_url), so later crawls skip it instead of downloading it again.
+        """
+        duplicate = self.db.query(Document).filter(
+            Document.content_hash == text_hash
+        ).order_by(Document.id).first()
+
+        if duplicate:
+            print(f"Skipping duplicate content of document {duplicate.id}")
+            if url and url != duplicate.url:
+                self.db.execute(
+                    insert(DocumentURLAlias).values(
+                        url=url, document_id=duplicate.id, created_at=datetime.utcnow()
+                    ).on_conflict_do_nothing()
+                )
+
+        return duplicate
+
+    def _create_document(
+        self,
+        title: str,
+        content_text: str,
+        content_type: str,
+        url: Optional[str],
+        source_id: Optional[int],
+        file_path: Optional[str],
+        text_hash: Optional[str] = None
+    ) -> Document:
+        """Create the document record and flush to get its ID."""
+        document = Document(
             title=title,
             content_text=content_text,
-            content_type="pdf",
+            content_type=content_type,
+            content_hash=text_hash or content_hash(content_text),
             url=url,
             source_id=source_id,
-            file_path=file_path
+            original_file_path=file_path,
+            crawled_at=datetime.utcnow()
+        )
+
+        self.db.add(document)
+        self.db.flush()  # Get document ID
+
+        self._index_near_duplicates(document)
+
+        return document
+
+    def _index_near_duplicates(self, document: Document):
+        """Link the document to an earlier near-duplicate, if any, and index its signature."""
+        signature = near_duplicates.minhash_signature(document.content_text)
+
+        match = near_duplicates.find_near_duplicate(self.db, signature, exclude_id=document.id)
+        if match:
+            prior, score = match
+            document.near_duplicate_of_id = prior.id
+            print(f"Document {document.id} is a near-duplicate of {prior.id} (similarity {score:.2f})")
+
+        near_duplicates.index_document(self.db, document, signature)
+
+    def _reuse_enrichment(self, document: Document) -> bool:
+        """
+        Copy summary, explanation, tags and entities from the document's near-duplicate.
+        Returns False (enrichment still needed) if there is none or it isn't enriched yet.
+        """
+        if not document.near_duplicate_of_id:
+            return False
+
+        prior = self.db.query(Document).filter(Document.id == document.near_duplicate_of_id).first()
+        if not prior or not prior.summary:
+            return False
+
+        document.summary = prior.summary
+        document.explanation = prior.explanation
+        bulk_store.link_tags(self.db, document.id, [tag.id for tag in prior.tags])
+        bulk_store.link_entities(self.db, document.id, [entity.id for entity in prior.entities])
+
+        return True
+
+    def _enrich(self, content_text: str) -> Dict[str, Any]:
+        """Generate summary, explanation, tags and entities for a document."""
+        ai_provider = get_ai_provider()
+
+        if settings.ai_enrichment_mode == "combined":
+            return ai_provider.enrich_document(content_text)
+
+        return {
+            "summary": ai_provider.generate_summary(content_text),
+            "explanation": ai_provider.generate_explanation(content_text),
+            "tags": ai_provider.classify_tags(content_text),
+            "entities": ai_provider.extract_entities(content_text),
+        }
+
+    async def _enrich_async(self, content_text: str) -> Dict[str, Any]:
+        """Async variant of _enrich; separate calls run concurrently."""
+        ai_provider = get_async_ai_provider()
+
+        if settings.ai_enrichment_mode == "combined":
+            return await ai_provider.enrich_document(content_text)
+
+        summary, explanation, tags, entities = await asyncio.gather(
+            ai_provider.generate_summary(content_text),
+            ai_provider.generate_explanation(content_text),
+            ai_provider.classify_tags(content_text),
+            ai_provider.extract_entities(content_text)
         )
+        return {"summary": summary, "explanation": explanation, "tags": tags, "entities": entities}
+
+    def _apply_enrichment(self, document: Document, enrichment: Dict[str, Any]):
+        """
+        Store AI-generated summary, explanation, tags and entities on a document.
+        Expects a dict with 'summary', 'explanation', 'tags' and 'entities' keys.
+        Tags and entities are upserted and linked in one statement each.
+        """
+        # Summary and explanation
+        document.summary = enrichment["summary"]
+        document.explanation = enrichment["explanation"]
+
+        # Tags
+        tag_ids = self._resolve_tag_ids(enrichment["tags"])
+        bulk_store.link_tags(self.db, document.id, tag_ids)
+
+        # Entities
+        entity_ids = self._resolve_entity_ids(enrichment["entities"])
+        bulk_store.link_entities(self.db, document.id, entity_ids)
 
     def regenerate_summary(self, document_id: int) -> Document:
         """Regenerate summary and explanation for a document."""
@@ -129,6 +490,7 @@ class DocumentProcessor:
         if not document:
             raise ValueError("Document not found")
 
+        ai_provider = get_ai_provider()
         document.summary = ai_provider.generate_summary(document.content_text)
         document.explanation = ai_provider.generate_explanation(document.content_text)
         document.updated_at = datetime.utcnow()
@@ -141,62 +503,108 @@ class DocumentProcessor:
     def _create_sections(self, document: Document, content_text: str):
         """
         Split document into sections and generate embeddings.
-        For simplicity, we split into chunks of ~800 characters.
+        Chunks already embedded elsewhere reuse that vector; the rest are
+        embedded in batches rather than one call per chunk.
         """
-        chunk_size = 800
-        overlap = 100
-
-        sections = []
-        start = 0
-        order_index = 0
-
-        while start < len(content_text):
-            end = start + chunk_size
-            chunk = content_text[start:end]
-
-            if chunk.strip():
-                # Generate embedding
-                embedding = ai_provider.embed_text(chunk)
-
-                section = DocumentSection(
-                    document_id=document.id,
-                    order_index=order_index,
-                    heading=None,  # Could extract headings with more sophisticated parsing
-                    text=chunk,
-                    embedding=embedding
-                )
-                sections.append(section)
-                order_index += 1
-
-            start = end - overlap  # Overlap to avoid splitting important context
-
-        self.db.add_all(sections)
-
-    def _get_or_create_tag(self, tag_name: str) -> Tag:
-        """Get existing tag or create new one."""
-        tag_slug = slugify(tag_name)
-
-        tag = self.db.query(Tag).filter(Tag.slug == tag_slug).first()
-        if not tag:
-            tag = Tag(name=tag_name, slug=tag_slug)
-            self.db.add(tag)
-            self.db.flush()
+        chunks = self._split_chunks(content_text)
+        hashes, embeddings = self._reuse_embeddings(chunks)
+        reused = [embedding is not None for embedding in embeddings]
 
-        return tag
+        # With deferred embeddings, the rest stay pending for the backfill worker
+        if not settings.defer_embeddings:
+            missing = chunk_dedup.missing_texts([chunk.text for chunk in chunks], hashes, embeddings)
+            if missing:
+                new = get_ai_provider().embed_texts(list(missing.values()))
+                chunk_dedup.fill(embeddings, hashes, dict(zip(missing, new)))
 
-    def _get_or_create_entity(self, name: str, entity_type: str) -> Optional[Entity]:
-        """Get existing entity or create new one."""
-        if not name or not name.strip():
-            return None
+        self._add_sections(document, chunks, embeddings, not settings.defer_embeddings, hashes, reused)
 
-        entity = self.db.query(Entity).filter(
-            Entity.name == name,
-            Entity.type == entity_type
-        ).first()
-
-        if not entity:
-            entity = Entity(name=name, type=entity_type)
-            self.db.add(entity)
-            self.db.flush()
+    def _reuse_embeddings(self, chunks: List[Chunk]) -> tuple:
+        """
+        Hash each chunk and look up embeddings stored for identical chunks.
+        Returns (hashes, embeddings) with None where no embedding exists yet.
+        """
+        hashes = [content_hash(chunk.text) for chunk in chunks]
+        known = chunk_dedup.find_embeddings(self.db, hashes)
+        return hashes, [known.get(chunk_hash) for chunk_hash in hashes]
+
+    async def _embed_all_async(self, chunks: List[Chunk]) -> tuple:
+        """Reuse or generate embeddings for chunks. Returns (hashes, embeddings, reused)."""
+        hashes, embeddings = self._reuse_embeddings(chunks)
+        reused = [embedding is not None for embedding in embeddings]
+        await self._embed_chunks_async(chunks, hashes, embeddings)
+        return hashes, embeddings, reused
+
+    async def _embed_chunks_async(
+        self,
+        chunks: List[Chunk],
+        hashes: List[str],
+        embeddings: List[Optional[List[float]]]
+    ):
+        """Embed the chunks without a reused embedding, filling embeddings in place."""
+        if settings.defer_embeddings:
+            return
+
+        missing = chunk_dedup.missing_texts([chunk.text for chunk in chunks], hashes, embeddings)
+        if missing:
+            new = await get_async_ai_provider().embed_texts(list(missing.values()))
+            chunk_dedup.fill(embeddings, hashes, dict(zip(missing, new)))
+
+    def _split_chunks(self, content_text: str) -> List[Chunk]:
+        """
+        Split text into chunks at heading, paragraph and sentence boundaries.
+        See app.services.chunker for the token budgets.
+        """
+        return list(chunk_text(content_text))
 
-        return entity
+    def _add_sections(
+        self,
+        document: Document,
+        chunks: List[Chunk],
+        embeddings: List[Optional[List[float]]],
+        attempted: bool = True,
+        hashes: Optional[List[str]] = None,
+        reused: Optional[List[bool]] = None
+    ):
+        """
+        Create section records for chunks and their embeddings in one INSERT.
+        Chunks without an embedding are stored as NULL and left pending for backfill.
+        attempted is False when embedding was deferred rather than tried and failed.
+        """
+        bulk_store.insert_sections(self.db, document.id, chunks, embeddings, attempted, hashes, reused)
+
+    def _resolve_tag_ids(self, tag_names: List[str]) -> List[int]:
+        """Get or create tags by name and return their IDs. Cached IDs skip the database."""
+        tags = {}
+        for tag_name in tag_names:
+            tag_slug = slugify(tag_name)
+            if tag_slug:
+                tags.setdefault(tag_slug, tag_name)
+
+        ids = tag_id_cache.get_many(tags)
+        missing = {slug: name for slug, name in tags.items() if slug not in ids}
+        if missing:
+            resolved = bulk_store.upsert_tags(self.db, missing)
+            cache_after_commit(self.db, tag_id_cache, resolved)
+            ids.update(resolved)
+
+        return list(ids.values())
+
+    def _resolve_entity_ids(self, entities: List[Dict[str, str]]) -> List[int]:
+        """Get or create entities by (name, type) and return their IDs. Cached IDs skip the database."""
+        keys = []
+        for entity_data in entities:
+            name = (entity_data.get('name') or '').strip()
+            if name:
+                key = (name, entity_data.get('type') or 'unknown')
+                if key not in keys:
+                    keys.append(key)
+
+        ids = entity_id_cache.get_many(keys)
+        missing = [key for key in keys if key not in ids]
+        if missing:
+            resolved = bulk_store.upsert_entities(self.db, missing)
+            cache_after_commit(self.db, entity_id_cache, resolved)
+            ids.update(resolved)
+
+        return list(ids.values())
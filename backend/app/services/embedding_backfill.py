@@ -0,0 +1,125 @@
+"""
+Embedding backfill service.
+Re-embeds document sections whose embedding failed or was deferred at ingestion.
+
+Run as a worker with: python -m app.services.embedding_backfill
+"""
+from sqlalchemy.orm import Session
+from typing import Dict, Optional
+
+from app.config import settings
+from app.db.base import SessionLocal
+from app.models.document import DocumentSection
+from app.services import chunk_dedup
+from app.services.ai_backends import embedding_model
+from app.services.ai_provider import get_ai_provider
+from app.services.chunker import content_hash
+from app.services.vector_search import binary_signature
+
+
+class EmbeddingBackfill:
+    """Embed pending sections in batches under the shared AI rate budget."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def run_once(
+        self,
+        batch_size: int = settings.embedding_batch_size,
+        document_id: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Claim and embed one batch of pending sections, optionally for one document.
+        Rows are locked with SKIP LOCKED so several workers can run side by side.
+        """
+        query = self.db.query(DocumentSection).filter(
+            DocumentSection.embedding_status == "pending"
+        )
+        if document_id is not None:
+            query = query.filter(DocumentSection.document_id == document_id)
+
+        sections = query.order_by(
+            DocumentSection.id
+        ).limit(batch_size).with_for_update(skip_locked=True).all()
+
+        if not sections:
+            return {"claimed": 0, "embedded": 0, "failed": 0}
+
+        # Reuse embeddings of identical chunks; only the rest hit the API
+        texts = [section.text for section in sections]
+        hashes = [section.chunk_hash or content_hash(section.text) for section in sections]
+        known = chunk_dedup.find_embeddings(self.db, hashes)
+        embeddings = [known.get(chunk_hash) for chunk_hash in hashes]
+
+        missing = chunk_dedup.missing_texts(texts, hashes, embeddings)
+        if missing:
+            new = get_ai_provider().embed_texts(list(missing.values()))
+            chunk_dedup.fill(embeddings, hashes, dict(zip(missing, new)))
+
+        model = embedding_model()
+        embedded = 0
+        failed = 0
+        for section, chunk_hash, embedding in zip(sections, hashes, embeddings):
+            section.chunk_hash = chunk_hash
+            section.embedding_attempts += 1
+
+            if embedding is not None:
+                section.embedding = embedding
+                section.embedding_bits = binary_signature(embedding)
+                section.embedding_status = "ready"
+                section.embedding_reused = chunk_hash in known
+                section.embedding_model = model
+                embedded += 1
+            elif section.embedding_attempts >= settings.embedding_max_attempts:
+                section.embedding_status = "failed"
+                failed += 1
+
+        self.db.commit()
+
+        return {"claimed": len(sections), "embedded": embedded, "failed": failed}
+
+    def run(self, max_batches: int = 0, document_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Process batches until nothing is pending (or max_batches is reached).
+        Stops early if a whole batch fails, since the API is likely unavailable.
+        """
+        totals = {"claimed": 0, "embedded": 0, "failed": 0}
+        batches = 0
+
+        while not max_batches or batches < max_batches:
+            result = self.run_once(document_id=document_id)
+            batches += 1
+
+            for key, value in result.items():
+                totals[key] += value
+
+            if result["claimed"] == 0 or result["embedded"] == 0:
+                break
+
+        return totals
+
+    def pending_count(self, document_id: Optional[int] = None) -> int:
+        """Number of sections still waiting for an embedding."""
+        query = self.db.query(DocumentSection).filter(
+            DocumentSection.embedding_status == "pending"
+        )
+        if document_id is not None:
+            query = query.filter(DocumentSection.document_id == document_id)
+        return query.count()
+
+
+def backfill_pending_embeddings(max_batches: int = 0) -> Dict[str, int]:
+    """Run a backfill pass with its own database session."""
+    db = SessionLocal()
+    try:
+        return EmbeddingBackfill(db).run(max_batches)
+    except Exception as e:
+        db.rollback()
+        print(f"Error backfilling embeddings: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print(backfill_pending_embeddings())
@@ -0,0 +1,248 @@
+"""
+Persistent cache for PDF extraction results.
+Keyed by the SHA-256 of the file bytes, so a PDF downloaded again under a new
+name is never re-parsed. Page texts and metadata are stored as zlib-compressed
+JSON in a local SQLite file; entries unused for extraction_cache_max_age_days
+are dropped, and least recently used entries go when the size limit is hit.
+
+Prune expired entries with: python -m app.services.extraction_cache
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+READ_BLOCK_SIZE = 1024 * 1024
+KNOWN_HASHES_MAX = 1024
+
+# path -> (size, mtime_ns, sha256) for files hashed while they were written
+_known_hashes: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+_known_hashes_lock = threading.Lock()
+
+
+def remember_file_hash(file_path: str, digest: str):
+    """Record a hash computed while writing the file, so file_sha256 needn't read it again."""
+    stat = os.stat(file_path)
+    with _known_hashes_lock:
+        _known_hashes[file_path] = (stat.st_size, stat.st_mtime_ns, digest)
+        _known_hashes.move_to_end(file_path)
+        while len(_known_hashes) > KNOWN_HASHES_MAX:
+            _known_hashes.popitem(last=False)
+
+
+def file_sha256(file_path: str) -> str:
+    """Hex SHA-256 of a file's contents, read in blocks unless it was recorded when written."""
+    with _known_hashes_lock:
+        known = _known_hashes.get(file_path)
+    if known is not None:
+        stat = os.stat(file_path)
+        if (stat.st_size, stat.st_mtime_ns) == known[:2]:
+            return known[2]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(READ_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed cache of extracted page texts and metadata per file hash."""
+
+    def __init__(self, path: str, max_bytes: int, max_age_days: int, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite database on first use. Must be called with the lock held."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extractions (
+                    file_hash TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    raw_size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_extractions_last_access ON extractions (last_access)"
+            )
+            conn.commit()
+
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM extractions"
+            ).fetchone()[0]
+            self._conn = conn
+
+        return self._conn
+
+    def get(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Return {"pages": [...], "metadata": {...}} for the file hash, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT payload FROM extractions WHERE file_hash = ?", (file_hash,)
+                ).fetchone()
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                conn.execute(
+                    "UPDATE extractions SET last_access = ? WHERE file_hash = ?", (time.time(), file_hash)
+                )
+                conn.commit()
+                self.hits += 1
+
+            return json.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            print(f"Error reading extraction cache: {e}")
+            return None
+
+    def set(self, file_hash: str, pages: List[str], metadata: Dict[str, Any]):
+        """Store the page texts and metadata extracted from a file."""
+        if not self.enabled:
+            return
+
+        try:
+            raw = json.dumps({"pages": pages, "metadata": metadata}, ensure_ascii=False).encode("utf-8")
+            payload = zlib.compress(raw, 6)
+            now = time.time()
+
+            with self._lock:
+                conn = self._connect()
+                previous = conn.execute(
+                    "SELECT size FROM extractions WHERE file_hash = ?", (file_hash,)
+                ).fetchone()
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO extractions "
+                    "(file_hash, payload, size, raw_size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                    (file_hash, payload, len(payload), len(raw), now, now)
+                )
+                self._total_bytes += len(payload) - (previous[0] if previous else 0)
+
+                if self._total_bytes > self.max_bytes:
+                    self._evict(conn)
+
+                conn.commit()
+        except Exception as e:
+            print(f"Error writing extraction cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until the cache is back under 90% of its limit."""
+        target = int(self.max_bytes * 0.9)
+
+        # Other worker processes share the file, so recount before evicting
+        self._total_bytes = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM extractions"
+        ).fetchone()[0]
+
+        while self._total_bytes > target:
+            rows = conn.execute(
+                "SELECT file_hash, size FROM extractions ORDER BY last_access LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+
+            freed = []
+            for file_hash, size in rows:
+                if self._total_bytes <= target:
+                    break
+                freed.append((file_hash,))
+                self._total_bytes -= size
+
+            conn.executemany("DELETE FROM extractions WHERE file_hash = ?", freed)
+            self.evictions += len(freed)
+
+    def prune(self) -> int:
+        """Delete entries unused for max_age_days and enforce the size limit. Returns entries removed."""
+        if not self.enabled:
+            return 0
+
+        with self._lock:
+            conn = self._connect()
+            evictions_before = self.evictions
+
+            if self.max_age_days > 0:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed = conn.execute(
+                    "DELETE FROM extractions WHERE last_access < ?", (cutoff,)
+                ).rowcount
+                self.evictions += removed
+
+            self._evict(conn)
+            conn.commit()
+
+            return self.evictions - evictions_before
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, entry count and compressed size."""
+        lookups = self.hits + self.misses
+        entries = 0
+        raw_bytes = 0
+
+        if self.enabled:
+            try:
+                with self._lock:
+                    entries, raw_bytes, self._total_bytes = self._connect().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(size), 0) FROM extractions"
+                    ).fetchone()
+            except Exception as e:
+                print(f"Error reading extraction cache: {e}")
+
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": self._total_bytes,
+            "uncompressed_bytes": raw_bytes,
+            "max_bytes": self.max_bytes,
+            "max_age_days": self.max_age_days,
+        }
+
+
+# Singleton instance
+extraction_cache = ExtractionCache(
+    path=settings.extraction_cache_path,
+    max_bytes=settings.extraction_cache_max_mb * 1024 * 1024,
+    max_age_days=settings.extraction_cache_max_age_days,
+    enabled=settings.extraction_cache_enabled
+)
+
+
+if __name__ == "__main__":
+    print(f"Removed {extraction_cache.prune()} cached extractions")
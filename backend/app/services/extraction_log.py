@@ -0,0 +1,115 @@
+"""
+Per-file PDF extraction log.
+Each extraction records its extractor, page and font counts and wall time in
+pdf_extractions, so slow sources show up. Image-only files are recorded with
+status 'needs_ocr'; those rows are the queue of files waiting for OCR.
+"""
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+
+from app.db.base import SessionLocal
+from app.models.document_source import DocumentSource
+from app.models.pdf_extraction import PDFExtraction
+
+
+def record(
+    file_path: str,
+    url: Optional[str],
+    source_id: Optional[int],
+    metadata: Dict[str, Any],
+    elapsed: float,
+    status: str
+):
+    """
+    Store one extraction outcome. Uses its own session so the entry survives
+    the caller rolling back (a needs-OCR file fails the surrounding work).
+    """
+    db = SessionLocal()
+    try:
+        db.add(PDFExtraction(
+            source_id=source_id,
+            url=url,
+            file_path=file_path,
+            status=status,
+            extractor=metadata.get("extractor"),
+            cached=bool(metadata.get("cached")),
+            text_layer=metadata.get("text_layer"),
+            font_count=metadata.get("font_count"),
+            page_count=metadata.get("num_pages"),
+            elapsed_ms=int(elapsed * 1000)
+        ))
+        db.commit()
+    except Exception as e:
+        print(f"Error recording PDF extraction: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def awaiting_ocr(db: Session, url: str) -> bool:
+    """Whether the file at this URL is already queued for OCR (so it isn't downloaded again)."""
+    return db.query(PDFExtraction.id).filter(
+        PDFExtraction.url == url,
+        PDFExtraction.status == "needs_ocr"
+    ).first() is not None
+
+
+def needs_ocr(db: Session, limit: int = 100) -> List[Dict[str, Any]]:
+    """Latest files that have no text layer and wait for OCR."""
+    rows = db.query(PDFExtraction).filter(
+        PDFExtraction.status == "needs_ocr"
+    ).order_by(PDFExtraction.created_at.desc()).limit(limit).all()
+
+    return [
+        {
+            "id": row.id,
+            "source_id": row.source_id,
+            "url": row.url,
+            "file_path": row.file_path,
+            "page_count": row.page_count,
+            "font_count": row.font_count,
+            "created_at": row.created_at,
+        }
+        for row in rows
+    ]
+
+
+def source_stats(db: Session) -> List[Dict[str, Any]]:
+    """Extraction time per source, slowest average first, with needs-OCR and PyPDF2 counts."""
+    needs_ocr_count = func.sum(case((PDFExtraction.status == "needs_ocr", 1), else_=0))
+    pypdf2_count = func.sum(case((PDFExtraction.extractor == "pypdf2", 1), else_=0))
+    average_ms = func.avg(PDFExtraction.elapsed_ms)
+
+    rows = db.query(
+        PDFExtraction.source_id,
+        DocumentSource.name,
+        func.count(PDFExtraction.id).label("files"),
+        func.sum(PDFExtraction.page_count).label("pages"),
+        average_ms.label("avg_ms"),
+        func.max(PDFExtraction.elapsed_ms).label("max_ms"),
+        needs_ocr_count.label("needs_ocr"),
+        pypdf2_count.label("pypdf2")
+    ).outerjoin(
+        DocumentSource, PDFExtraction.source_id == DocumentSource.id
+    ).filter(
+        PDFExtraction.cached.is_(False)
+    ).group_by(
+        PDFExtraction.source_id, DocumentSource.name
+    ).order_by(
+        average_ms.desc()
+    ).all()
+
+    return [
+        {
+            "source_id": row.source_id,
+            "source_name": row.name,
+            "files": row.files,
+            "pages": int(row.pages or 0),
+            "avg_ms": round(float(row.avg_ms or 0), 1),
+            "max_ms": row.max_ms,
+            "needs_ocr": int(row.needs_ocr or 0),
+            "pypdf2": int(row.pypdf2 or 0),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,125 @@
+"""
+Process-wide LRU caches of tag and entity IDs.
+Saves the upsert round trip for tags and entities seen on earlier documents.
+
+IDs resolved inside a transaction are only cached once it commits, so a
+rolled-back insert never leaves an ID for a row that doesn't exist.
+Concurrent inserts by other workers are safe: misses go through the
+ON CONFLICT upsert, which returns the existing row's ID.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.base import SessionLocal
+from app.models.tag import Tag, DocumentTag
+from app.models.entity import Entity, DocumentEntity
+
+PENDING_KEY = "id_cache_pending"
+
+
+class IdCache:
+    """Thread-safe LRU map of natural key -> row ID."""
+
+    def __init__(self, name: str, max_size: int):
+        self.name = name
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, int]:
+        """Return cached IDs for the keys that are present."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                row_id = self._entries.get(key)
+                if row_id is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = row_id
+                self.hits += 1
+        return found
+
+    def put_many(self, ids: Dict[Hashable, int]):
+        """Add IDs, evicting the least recently used entries beyond max_size."""
+        with self._lock:
+            for key, row_id in ids.items():
+                self._entries[key] = row_id
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def cache_after_commit(db: Session, cache: IdCache, ids: Dict[Hashable, int]):
+    """Cache IDs resolved in the session's transaction once it commits."""
+    db.info.setdefault(PENDING_KEY, []).append((cache, ids))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session):
+    for cache, ids in session.info.pop(PENDING_KEY, []):
+        cache.put_many(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def warm(db: Session):
+    """Fill both caches with the most frequently linked tags and entities."""
+    tags = db.query(Tag.slug, Tag.id).outerjoin(
+        DocumentTag, DocumentTag.c.tag_id == Tag.id
+    ).group_by(Tag.id).order_by(
+        func.count(DocumentTag.c.document_id).desc()
+    ).limit(tag_id_cache.max_size).all()
+    tag_id_cache.put_many({row.slug: row.id for row in reversed(tags)})
+
+    entities = db.query(Entity.name, Entity.type, Entity.id).outerjoin(
+        DocumentEntity, DocumentEntity.c.entity_id == Entity.id
+    ).group_by(Entity.id).order_by(
+        func.count(DocumentEntity.c.document_id).desc()
+    ).limit(entity_id_cache.max_size).all()
+    entity_id_cache.put_many({(row.name, row.type): row.id for row in reversed(entities)})
+
+    print(f"Warmed ID caches with {len(tags)} tags and {len(entities)} entities")
+
+
+def warm_id_caches():
+    """Warm the caches with their own database session."""
+    db = SessionLocal()
+    try:
+        warm(db)
+    except Exception as e:
+        print(f"Error warming ID caches: {e}")
+    finally:
+        db.close()
+
+
+# Singleton instances
+tag_id_cache = IdCache("tags", settings.tag_id_cache_size)
+entity_id_cache = IdCache("entities", settings.entity_id_cache_size)
@@ -0,0 +1,362 @@
+"""
+Staged ingestion pipeline backed by the ingestion_tasks work queue.
+
+Stages and the tasks each one enqueues when it succeeds:
+    fetch   -> extract           (download HTML text or a PDF file)
+    extract -> chunk, enrich     (create the document record)
+    chunk   -> embed             (split into pending sections)
+    embed                        (embed the document's pending sections)
+    enrich                       (summary, explanation, tags, entities)
+
+Workers claim tasks with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+them can run per stage. Failed tasks are retried with exponential backoff;
+scanned PDFs without a text layer end in the 'needs_ocr' state instead.
+
+Run a worker with: python -m app.services.ingestion_pipeline --stages extract,chunk
+"""
+import argparse
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.base import SessionLocal
+from app.ingestion import get_scraper_for_source
+from app.ingestion.http_cache import TransferStats
+from app.models.crawl_job import CrawlJob
+from app.models.document import Document
+from app.models.document_source import DocumentSource
+from app.models.ingestion_task import IngestionTask
+from app.services import extraction_log
+from app.services.document_processor import DocumentProcessor, known_url
+from app.services.embedding_backfill import EmbeddingBackfill
+from app.services.id_cache import warm_id_caches
+from app.services.pdf_extractor import NeedsOCR
+
+STAGES = ["fetch", "extract", "chunk", "embed", "enrich"]
+
+
+def enqueue(
+    db: Session,
+    stage: str,
+    payload: Optional[Dict] = None,
+    source_id: Optional[int] = None,
+    document_id: Optional[int] = None,
+    crawl_job_id: Optional[int] = None
+) -> IngestionTask:
+    """Add a task to the queue. The caller commits."""
+    if stage not in STAGES:
+        raise ValueError(f"Unknown ingestion stage: {stage}")
+
+    task = IngestionTask(
+        stage=stage,
+        status="pending",
+        payload=payload or {},
+        source_id=source_id,
+        document_id=document_id,
+        crawl_job_id=crawl_job_id,
+        available_at=datetime.utcnow()
+    )
+    db.add(task)
+    return task
+
+
+def claim(db: Session, stages: List[str], worker_id: str) -> Optional[IngestionTask]:
+    """
+    Claim the oldest available task for the given stages.
+    Running tasks whose lock has expired (a crashed worker) are claimed again.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.ingestion_lock_timeout_seconds)
+
+    task = db.query(IngestionTask).filter(
+        IngestionTask.stage.in_(stages),
+        or_(
+            and_(IngestionTask.status == "pending", IngestionTask.available_at <= now),
+            and_(IngestionTask.status == "running", IngestionTask.locked_at < stale)
+        )
+    ).order_by(
+        IngestionTask.available_at
+    ).limit(1).with_for_update(skip_locked=True).first()
+
+    if not task:
+        db.rollback()
+        return None
+
+    task.status = "running"
+    task.locked_at = now
+    task.locked_by = worker_id
+    task.attempts += 1
+    db.commit()
+
+    return task
+
+
+def _fetch(db: Session, task: IngestionTask):
+    """Download one document and hand its text or file to the extract stage."""
+    payload = task.payload
+    url = payload["url"]
+
+    if known_url(db, url) or extraction_log.awaiting_ocr(db, url):
+        return
+
+    source = db.query(DocumentSource).filter(DocumentSource.id == task.source_id).first()
+    if not source:
+        raise ValueError(f"Source {task.source_id} not found")
+
+    scraper = get_scraper_for_source(source)
+    try:
+        if payload.get("pdf"):
+            doc_data = {"type": "pdf", "url": url, "title": payload.get("title")}
+        else:
+            doc_data = scraper.fetch_document_content(url)
+
+        if not doc_data:
+            return
+
+        if doc_data['type'] == 'pdf':
+            upload_dir = settings.upload_dir
+            os.makedirs(upload_dir, exist_ok=True)
+            file_path = os.path.join(upload_dir, f"{uuid.uuid4()}.pdf")
+
+            if not scraper.fetch_pdf(doc_data['url'], file_path):
+                raise RuntimeError(f"Could not download PDF from {doc_data['url']}")
+
+            enqueue(db, "extract", {
+                "title": doc_data['title'],
+                "url": doc_data['url'],
+                "file_path": file_path,
+                "content_type": "pdf",
+            }, source_id=task.source_id, crawl_job_id=task.crawl_job_id)
+
+        elif doc_data.get('text'):
+            enqueue(db, "extract", {
+                "title": doc_data['title'],
+                "url": doc_data['url'],
+                "content_text": doc_data['text'],
+                "content_type": "html",
+            }, source_id=task.source_id, crawl_job_id=task.crawl_job_id)
+
+            # PDF attachments found in HTML content are fetched as their own tasks
+            for pdf_url in doc_data.get('pdf_links') or []:
+                enqueue(db, "fetch", {
+                    "url": pdf_url,
+                    "title": f"{doc_data['title']} - Attachment",
+                    "pdf": True,
+                }, source_id=task.source_id, crawl_job_id=task.crawl_job_id)
+
+        add_transfer(db, task.crawl_job_id, scraper.transfer)
+    finally:
+        scraper.close()
+
+
+def add_transfer(db: Session, crawl_job_id: Optional[int], transfer: TransferStats):
+    """Add a fetch's downloaded and saved bytes to its crawl job. The caller commits."""
+    if not crawl_job_id:
+        return
+
+    db.query(CrawlJob).filter(CrawlJob.id == crawl_job_id).update({
+        CrawlJob.bytes_downloaded: CrawlJob.bytes_downloaded + transfer.downloaded_bytes,
+        CrawlJob.bytes_saved: CrawlJob.bytes_saved + transfer.saved_bytes,
+        CrawlJob.not_modified: CrawlJob.not_modified + transfer.not_modified,
+    }, synchronize_session=False)
+
+
+def _extract(db: Session, task: IngestionTask):
+    """Create the document record, then fan out to the chunk and enrich stages."""
+    payload = task.payload
+
+    if payload.get("url") and known_url(db, payload["url"]):
+        _discard_download(payload)
+        return
+
+    document, created = DocumentProcessor(db).extract_stage(
+        title=payload.get("title"),
+        content_text=payload.get("content_text"),
+        content_type=payload.get("content_type", "html"),
+        url=payload.get("url"),
+        source_id=task.source_id,
+        file_path=payload.get("file_path")
+    )
+    task.document_id = document.id
+
+    if created:
+        enqueue_document_stages(db, document, crawl_job_id=task.crawl_job_id)
+    else:
+        # The existing document keeps its own file
+        _discard_download(payload)
+
+
+def _discard_download(payload: Dict):
+    """Remove a PDF downloaded by the fetch stage that no document keeps."""
+    file_path = payload.get("file_path")
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def enqueue_document_stages(db: Session, document: Document, crawl_job_id: Optional[int] = None):
+    """Queue the stages that follow extraction for a newly created document."""
+    for stage in ("chunk", "enrich"):
+        enqueue(db, stage, source_id=document.source_id, document_id=document.id, crawl_job_id=crawl_job_id)
+
+
+def _chunk(db: Session, task: IngestionTask):
+    """Split the document into pending sections and queue their embedding."""
+    document = _get_document(db, task)
+    DocumentProcessor(db).chunk_stage(document)
+    enqueue(db, "embed", source_id=task.source_id, document_id=document.id, crawl_job_id=task.crawl_job_id)
+
+
+def _embed(db: Session, task: IngestionTask):
+    """Embed the document's pending sections; retried while any remain pending."""
+    backfill = EmbeddingBackfill(db)
+    backfill.run(document_id=task.document_id)
+
+    pending = backfill.pending_count(document_id=task.document_id)
+    if pending:
+        raise RuntimeError(f"{pending} sections still pending")
+
+
+def _enrich(db: Session, task: IngestionTask):
+    """Generate AI summary, explanation, tags and entities for the document."""
+    DocumentProcessor(db).enrich_stage(_get_document(db, task))
+
+
+def _get_document(db: Session, task: IngestionTask) -> Document:
+    document = db.query(Document).filter(Document.id == task.document_id).first()
+    if not document:
+        raise ValueError(f"Document {task.document_id} not found")
+    return document
+
+
+HANDLERS = {
+    "fetch": _fetch,
+    "extract": _extract,
+    "chunk": _chunk,
+    "embed": _embed,
+    "enrich": _enrich,
+}
+
+
+def run_task(db: Session, task: IngestionTask) -> bool:
+    """
+    Run a claimed task. The stage's output, the task's completion and its
+    follow-up tasks are committed together. Returns True on success.
+    """
+    try:
+        HANDLERS[task.stage](db, task)
+        task.status = "done"
+        task.locked_at = None
+        task.locked_by = None
+        task.last_error = None
+        db.commit()
+    except NeedsOCR as e:
+        # Not retried: extraction would find nothing again until the file is OCRed
+        db.rollback()
+        print(f"{task.stage} task {task.id} needs OCR: {e}")
+
+        task.status = "needs_ocr"
+        task.last_error = str(e)
+        task.locked_at = None
+        task.locked_by = None
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error in {task.stage} task {task.id}: {e}")
+
+        task.last_error = str(e)
+        task.locked_at = None
+        task.locked_by = None
+        if task.attempts >= task.max_attempts:
+            task.status = "failed"
+        else:
+            task.status = "pending"
+            delay = settings.ingestion_retry_base_seconds * 2 ** (task.attempts - 1)
+            task.available_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.commit()
+
+    if task.crawl_job_id:
+        _update_crawl_job(db, task.crawl_job_id)
+
+    return task.status == "done"
+
+
+def _update_crawl_job(db: Session, crawl_job_id: int):
+    """Mark a queued crawl job finished once none of its tasks are outstanding."""
+    outstanding = db.query(IngestionTask.id).filter(
+        IngestionTask.crawl_job_id == crawl_job_id,
+        IngestionTask.status.in_(["pending", "running"])
+    ).first()
+    if outstanding:
+        return
+
+    job = db.query(CrawlJob).filter(CrawlJob.id == crawl_job_id).first()
+    if not job or job.finished_at:
+        return
+
+    unfinished = dict(db.query(IngestionTask.status, func.count(IngestionTask.id)).filter(
+        IngestionTask.crawl_job_id == crawl_job_id,
+        IngestionTask.status.in_(["failed", "needs_ocr"])
+    ).group_by(IngestionTask.status).all())
+
+    job.status = "success"
+    job.finished_at = datetime.utcnow()
+    problems = []
+    if unfinished.get("failed"):
+        problems.append(f"{unfinished['failed']} ingestion tasks failed")
+    if unfinished.get("needs_ocr"):
+        problems.append(f"{unfinished['needs_ocr']} PDFs need OCR")
+    if problems:
+        job.error_message = ", ".join(problems)
+    job.source.last_crawled_at = job.finished_at
+    db.commit()
+
+
+def stage_counts(db: Session) -> Dict[str, Dict[str, int]]:
+    """Task counts per stage and status."""
+    rows = db.query(
+        IngestionTask.stage, IngestionTask.status, func.count(IngestionTask.id)
+    ).group_by(IngestionTask.stage, IngestionTask.status).all()
+
+    counts = {stage: {} for stage in STAGES}
+    for stage, status, count in rows:
+        counts.setdefault(stage, {})[status] = count
+    return counts
+
+
+def run_worker(stages: List[str], worker_id: Optional[str] = None, once: bool = False):
+    """Claim and run tasks for the given stages until stopped (or the queue is empty with once=True)."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Ingestion worker {worker_id} running stages: {', '.join(stages)}")
+
+    if "enrich" in stages:
+        warm_id_caches()
+
+    while True:
+        db = SessionLocal()
+        try:
+            task = claim(db, stages, worker_id)
+            if task:
+                run_task(db, task)
+        finally:
+            db.close()
+
+        if not task:
+            if once:
+                return
+            time.sleep(settings.ingestion_poll_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an ingestion pipeline worker")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to process")
+    parser.add_argument("--once", action="store_true", help="Exit when no task is available")
+    args = parser.parse_args()
+
+    run_worker([stage.strip() for stage in args.stages.split(",") if stage.strip()], once=args.once)
@@ -0,0 +1,146 @@
+"""
+Near-duplicate document detection with MinHash and LSH banding.
+
+Each document's text is reduced to word shingles, summarized as a MinHash
+signature (stored on documents.minhash) and split into LSH bands (stored in
+document_lsh_bands). Documents sharing any band bucket are candidates; the
+fraction of equal signature values estimates their Jaccard similarity.
+
+Index existing documents with: python -m app.services.near_duplicates
+"""
+import hashlib
+import unicodedata
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.base import SessionLocal
+from app.models.document import Document
+from app.models.document_lsh_band import DocumentLSHBand
+from app.services.chunker import TOKEN
+
+MERSENNE_PRIME = (1 << 31) - 1
+SHINGLE_SIZE = 5  # Words per shingle
+
+# Fixed seed so signatures stay comparable across processes and restarts
+_random = np.random.RandomState(20261016)
+_A = _random.randint(1, MERSENNE_PRIME, size=settings.minhash_permutations, dtype=np.uint64)
+_B = _random.randint(0, MERSENNE_PRIME, size=settings.minhash_permutations, dtype=np.uint64)
+
+
+def shingles(text: str) -> set:
+    """Overlapping word n-grams of the normalized text."""
+    words = TOKEN.findall(unicodedata.normalize("NFKC", text).casefold())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """MinHash signature of the text's shingles, or None for empty text."""
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return None
+
+    hashes = np.array(
+        [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") & MERSENNE_PRIME
+            for s in shingle_set
+        ],
+        dtype=np.uint64
+    )
+    # (a * x + b) mod p for every permutation and shingle; products stay below 2^62
+    permuted = (np.outer(_A, hashes) + _B[:, None]) % MERSENNE_PRIME
+    return permuted.min(axis=1).astype(np.int64).tolist()
+
+
+def band_buckets(signature: List[int]) -> List[Tuple[int, int]]:
+    """Split a signature into (band, bucket) pairs."""
+    rows = len(signature) // settings.minhash_bands
+    buckets = []
+    for band in range(settings.minhash_bands):
+        values = signature[band * rows:(band + 1) * rows]
+        digest = hashlib.blake2b(repr(values).encode("ascii"), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+    return buckets
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def find_near_duplicate(
+    db: Session,
+    signature: List[int],
+    exclude_id: Optional[int] = None
+) -> Optional[Tuple[Document, float]]:
+    """Return the most similar indexed document at or above the threshold, with its similarity."""
+    if not signature or settings.near_duplicate_threshold <= 0:
+        return None
+
+    candidate_ids = db.query(DocumentLSHBand.document_id).filter(
+        tuple_(DocumentLSHBand.band, DocumentLSHBand.bucket).in_(band_buckets(signature))
+    ).distinct()
+    if exclude_id is not None:
+        candidate_ids = candidate_ids.filter(DocumentLSHBand.document_id != exclude_id)
+
+    # Only signatures are compared; the matching document is loaded afterwards
+    candidates = db.query(Document.id, Document.minhash).filter(Document.id.in_(candidate_ids)).all()
+
+    best = None
+    for candidate_id, minhash in candidates:
+        score = similarity(signature, minhash)
+        if score >= settings.near_duplicate_threshold and (best is None or score > best[1]):
+            best = (candidate_id, score)
+
+    if best is None:
+        return None
+    return db.get(Document, best[0]), best[1]
+
+
+def index_document(db: Session, document: Document, signature: Optional[List[int]]):
+    """Store a document's signature and LSH bands. The caller commits."""
+    document.minhash = signature
+    if not signature:
+        return
+
+    db.execute(
+        insert(DocumentLSHBand).values([
+            {"document_id": document.id, "band": band, "bucket": bucket}
+            for band, bucket in band_buckets(signature)
+        ]).on_conflict_do_nothing()
+    )
+
+
+def index_existing(batch_size: int = 100) -> int:
+    """Index documents that have no signature yet. Returns the number indexed."""
+    db = SessionLocal()
+    indexed = 0
+    try:
+        while True:
+            documents = db.query(Document).filter(
+                Document.minhash.is_(None)
+            ).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+
+            for document in documents:
+                # Empty texts get an empty signature so they aren't picked up again
+                index_document(db, document, minhash_signature(document.content_text) or [])
+                indexed += 1
+            db.commit()
+    finally:
+        db.close()
+
+    return indexed
+
+
+if __name__ == "__main__":
+    print(f"Indexed {index_existing()} documents")
@@ -1,11 +1,156 @@
 """
 PDF text extraction service.
 Uses pdfplumber as primary method with PyPDF2 as fallback.
+Large PDFs are extracted in parallel: page ranges are spread over a process pool.
+Results are cached by file hash (see extraction_cache).
+A pre-scan of a few pages picks the extractor, or flags image-only scans for OCR.
 """
 import pdfplumber
+from pdfminer.pdftypes import PDFObjRef, resolve1
 from PyPDF2 import PdfReader
-from typing import List, Dict
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import List, Dict, Iterator, NamedTuple, Optional, Tuple
+import multiprocessing
 import os
+import signal
+import threading
+
+from app.config import settings
+from app.services.extraction_cache import extraction_cache, file_sha256
+
+
+class ExtractedPDF(NamedTuple):
+    text: str
+    metadata: Dict[str, any]
+    page_count: int
+    page_offsets: List[int]  # Character offset in text where each page starts
+
+
+class PDFProfile(NamedTuple):
+    page_count: int
+    sampled_pages: int
+    text_pages: int  # Sampled pages with at least one font
+    font_count: int  # Distinct fonts across sampled pages
+    content_bytes: int  # Average decoded content stream size per sampled page
+    extractor: str  # 'pdfplumber', 'pypdf2' or 'ocr' (no text layer)
+
+
+class NeedsOCR(ValueError):
+    """The PDF has pages but no extractable text; it needs OCR."""
+
+
+class PageTimeout(Exception):
+    """A page took longer than settings.pdf_page_timeout_seconds to extract."""
+
+
+class SkippedPage(str):
+    """
+    Empty text standing in for a page whose extraction timed out. Behaves as
+    "" for readers; extractions containing one aren't cached, since the page
+    may well extract on another attempt.
+    """
+
+
+@contextmanager
+def _page_timeout(seconds: int):
+    """Raise PageTimeout after the given seconds (main thread of a Unix process only)."""
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_timeout(signum, frame):
+        raise PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_page_range(file_path: str, start: int, end: int, page_timeout: int) -> List[str]:
+    """
+    Extract pages [start, end) of a PDF. Runs in a pool worker process.
+    A page that times out or fails contributes empty text instead of failing the range.
+    """
+    texts = []
+    with pdfplumber.open(file_path) as pdf:
+        for index in range(start, end):
+            page = pdf.pages[index]
+            try:
+                with _page_timeout(page_timeout):
+                    texts.append(page.extract_text() or "")
+            except PageTimeout:
+                print(f"Page {index + 1} of {file_path} timed out after {page_timeout}s")
+                texts.append(SkippedPage())
+            except Exception as e:
+                print(f"Error extracting page {index + 1} of {file_path}: {e}")
+                texts.append("")
+            finally:
+                page.close()
+    return texts
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Lazily start the shared extraction pool (spawned, so it's safe from threaded servers)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.pdf_parallel_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool(terminate: bool = False):
+    """
+    Drop a broken pool so the next parallel extraction starts a fresh one.
+    With terminate, its worker processes are killed too (a hung worker never exits on its own).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            processes = list((getattr(_pool, "_processes", None) or {}).values()) if terminate else []
+            _pool.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            _pool = None
+
+
+def _use_parallel(page_count: int) -> bool:
+    return settings.pdf_parallel_workers > 1 and page_count >= settings.pdf_parallel_min_pages
+
+
+def _font_keys(resources, depth: int = 0) -> set:
+    """Fonts in a resource dictionary, including those of form XObjects it draws."""
+    resources = resolve1(resources)
+    if not isinstance(resources, dict):
+        return set()
+
+    fonts = resolve1(resources.get("Font"))
+    keys = {
+        ref.objid if isinstance(ref, PDFObjRef) else name
+        for name, ref in (fonts.items() if isinstance(fonts, dict) else [])
+    }
+
+    xobjects = resolve1(resources.get("XObject"))
+    if depth < 2 and isinstance(xobjects, dict):
+        for ref in xobjects.values():
+            xobject = resolve1(ref)
+            attrs = getattr(xobject, "attrs", {})
+            if getattr(attrs.get("Subtype"), "name", None) == "Form":
+                keys |= _font_keys(attrs.get("Resources"), depth + 1)
+
+    return keys
 
 
 class PDFExtractor:
@@ -17,36 +162,321 @@ class PDFExtractor:
         Extract all text from a PDF file.
         Returns the full text content.
         """
+        return "\n\n".join(text for _, text in PDFExtractor.iter_pages(file_path) if text)
+
+    @staticmethod
+    def extract(file_path: str) -> ExtractedPDF:
+        """
+        Open the PDF once and return its text, metadata, page count and page offsets.
+        PyPDF2 only opens the file again if pdfplumber finds no text.
+        Files extracted before (same SHA-256) come straight from the extraction cache.
+        """
+        text_parts = []
+        page_offsets = []
+        length = 0
+
+        with PDFExtractor.stream(file_path) as (metadata, pages):
+            for _, text in pages:
+                if text and text_parts:
+                    length += 2  # "\n\n" separator
+                page_offsets.append(length)
+                if text:
+                    text_parts.append(text)
+                    length += len(text)
+
+        metadata["num_pages"] = len(page_offsets)
+
+        return ExtractedPDF(
+            text="\n\n".join(text_parts),
+            metadata=metadata,
+            page_count=len(page_offsets),
+            page_offsets=page_offsets
+        )
+
+    @staticmethod
+    @contextmanager
+    def stream(file_path: str) -> Iterator[Tuple[Dict[str, any], Iterator[Tuple[int, str]]]]:
+        """
+        Yield (metadata, pages) for reading a PDF page by page, where pages
+        yields (page_number, text) like iter_pages.
+        A cached extraction is replayed without opening the file; otherwise the
+        pages are stored in the cache once they have all been read.
+        """
         try:
-            # Try pdfplumber first (better at preserving layout)
-            with pdfplumber.open(file_path) as pdf:
-                text_parts = []
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
+            file_hash = file_sha256(file_path)
+        except OSError as e:
+            print(f"Could not hash {file_path}: {e}")
+            file_hash = None
+
+        cached = extraction_cache.get(file_hash) if file_hash else None
+        if cached is not None:
+            yield {**cached["metadata"], "cached": True}, enumerate(cached["pages"], start=1)
+            return
+
+        with PDFExtractor.open(file_path) as pdf:
+            metadata = PDFExtractor.read_metadata(pdf)
+
+            if pdf is None:
+                metadata["extractor"] = "pypdf2"
+                pages = PDFExtractor._iter_pypdf2(file_path)
+            else:
+                profile = PDFExtractor.prescan(pdf)
+                metadata.update(
+                    extractor=profile.extractor,
+                    text_layer=profile.text_pages > 0,
+                    font_count=profile.font_count
+                )
+                if profile.extractor == "ocr":
+                    # Nothing to extract: report the pages without reading them
+                    pages = ((page_number, "") for page_number in range(1, profile.page_count + 1))
+                else:
+                    pages = PDFExtractor.iter_pages(file_path, pdf, profile.extractor)
+
+            yield metadata, PDFExtractor._cache_pages(file_hash, metadata, pages)
+
+    @staticmethod
+    def _cache_pages(
+        file_hash: Optional[str],
+        metadata: Dict[str, any],
+        pages: Iterator[Tuple[int, str]]
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Pass pages through, caching them once fully read. Files without any text,
+        or with pages skipped after a timeout, aren't cached.
+        """
+        texts = []
+        for page_number, text in pages:
+            texts.append(text)
+            yield page_number, text
+
+        if any(isinstance(text, SkippedPage) for text in texts):
+            print(f"Not caching extraction with timed-out pages ({metadata.get('title') or file_hash})")
+            return
 
-                full_text = "\n\n".join(text_parts)
-                if full_text.strip():
-                    return full_text
+        if file_hash and any(text.strip() for text in texts):
+            extraction_cache.set(file_hash, texts, {**metadata, "num_pages": len(texts)})
 
+    @staticmethod
+    @contextmanager
+    def open(file_path: str) -> Iterator[Optional[pdfplumber.PDF]]:
+        """Open a PDF with pdfplumber, yielding None if it can't be parsed."""
+        try:
+            pdf = pdfplumber.open(file_path)
         except Exception as e:
-            print(f"pdfplumber failed, trying PyPDF2: {e}")
+            print(f"pdfplumber could not open {file_path}: {e}")
+            yield None
+            return
 
         try:
-            # Fallback to PyPDF2
-            reader = PdfReader(file_path)
-            text_parts = []
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
+            yield pdf
+        finally:
+            pdf.close()
+
+    @staticmethod
+    def read_metadata(pdf: Optional[pdfplumber.PDF]) -> Dict[str, any]:
+        """Title, author, subject and creator from an open PDF, same shape as get_metadata."""
+        info = (pdf.metadata or {}) if pdf is not None else {}
+
+        def value(key: str) -> Optional[str]:
+            item = info.get(key)
+            if isinstance(item, bytes):
+                item = item.decode("utf-8", errors="ignore")
+            return str(item) if item else None
+
+        return {
+            "title": value("Title"),
+            "author": value("Author"),
+            "subject": value("Subject"),
+            "creator": value("Creator"),
+            "num_pages": len(pdf.pages) if pdf is not None else 0
+        }
+
+    @staticmethod
+    def prescan(pdf: pdfplumber.PDF) -> PDFProfile:
+        """
+        Inspect the resources and content streams of a few evenly spaced pages
+        without extracting any text, and pick an extractor:
+        no fonts on any sampled page means an image-only scan ('ocr'); very
+        heavy content streams go to PyPDF2, which skips layout analysis.
+        """
+        pages = pdf.pages
+        page_count = len(pages)
+        sample = min(page_count, max(1, settings.pdf_prescan_pages))
+        if sample <= 1:
+            indices = list(range(sample))
+        else:
+            indices = sorted({round(i * (page_count - 1) / (sample - 1)) for i in range(sample)})
+
+        fonts = set()
+        text_pages = 0
+        content_bytes = 0
+        try:
+            for index in indices:
+                page_obj = pages[index].page_obj
+                page_fonts = _font_keys(page_obj.resources)
+                if page_fonts:
+                    text_pages += 1
+                    fonts |= page_fonts
+                for stream in page_obj.contents or []:
+                    content_bytes += len(resolve1(stream).get_data())
+        except Exception as e:
+            print(f"PDF pre-scan failed, using pdfplumber: {e}")
+            return PDFProfile(page_count, len(indices), len(indices), len(fonts), 0, "pdfplumber")
+
+        average_bytes = content_bytes // len(indices) if indices else 0
+        if indices and not text_pages:
+            extractor = "ocr"
+        elif average_bytes > settings.pdf_heavy_page_kb * 1024:
+            extractor = "pypdf2"
+        else:
+            extractor = "pdfplumber"
+
+        return PDFProfile(page_count, len(indices), text_pages, len(fonts), average_bytes, extractor)
+
+    @staticmethod
+    def iter_pages(
+        file_path: str,
+        pdf: Optional[pdfplumber.PDF] = None,
+        extractor: str = "pdfplumber"
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) one page at a time, starting at 1.
+        Each pdfplumber page is released once its text is extracted, so memory
+        stays bounded on long files. If pdfplumber finds no text at all,
+        the pages are read again with PyPDF2; if that reads no pages either,
+        pdfplumber's empty pages are yielded, so the page count is kept.
+        Pass an already open pdf (see open) to avoid parsing the file again.
+        With extractor='pypdf2' (see prescan) the order is reversed.
+        """
+        if extractor == "pypdf2":
+            primary = PDFExtractor._iter_pypdf2(file_path)
+            fallback = lambda: PDFExtractor._iter_pdfplumber(file_path, pdf)
+        else:
+            primary = PDFExtractor._iter_pdfplumber(file_path, pdf)
+            fallback = lambda: PDFExtractor._iter_pypdf2(file_path)
+
+        # Empty pages are held back until some page has text, so a fallback
+        # retry never repeats page numbers that were already yielded
+        held_back = []
+        found_text = False
+
+        try:
+            for page_number, text in primary:
+                if not found_text and not text.strip():
+                    held_back.append((page_number, text))
+                    continue
+                if not found_text:
+                    found_text = True
+                    yield from held_back
+                yield page_number, text
 
-            return "\n\n".join(text_parts)
+        except Exception as e:
+            if found_text:
+                raise
+            print(f"{extractor} failed, trying the other extractor: {e}")
+
+        if not found_text:
+            fallback_pages = 0
+            try:
+                for page in fallback():
+                    fallback_pages += 1
+                    yield page
+            except Exception as e:
+                print(f"Fallback extraction also failed: {e}")
+
+            if not fallback_pages:
+                # The pages still count: an image-only file goes to OCR instead of failing
+                yield from held_back
+
+    @staticmethod
+    def _iter_pypdf2(file_path: str) -> Iterator[Tuple[int, str]]:
+        """Yield page texts with PyPDF2 (the fallback, or first choice for heavy pages)."""
+        try:
+            reader = PdfReader(file_path)
+            for index, page in enumerate(reader.pages):
+                yield index + 1, page.extract_text() or ""
 
         except Exception as e:
-            print(f"PyPDF2 also failed: {e}")
-            return ""
+            print(f"PyPDF2 failed: {e}")
+
+    @staticmethod
+    def _iter_pdfplumber(file_path: str, pdf: Optional[pdfplumber.PDF] = None) -> Iterator[Tuple[int, str]]:
+        """Yield page texts with pdfplumber, in parallel for large files."""
+        if pdf is None:
+            with pdfplumber.open(file_path) as opened:
+                yield from PDFExtractor._iter_pdfplumber(file_path, opened)
+            return
+
+        page_count = len(pdf.pages)
+
+        if _use_parallel(page_count):
+            yield from PDFExtractor._iter_parallel(file_path, page_count)
+            return
+
+        for index, page in enumerate(pdf.pages):
+            try:
+                text = page.extract_text() or ""
+            finally:
+                page.close()
+            yield index + 1, text
+
+    @staticmethod
+    def _iter_parallel(file_path: str, page_count: int) -> Iterator[Tuple[int, str]]:
+        """
+        Extract page ranges in the process pool and yield them in page order
+        as each range completes.
+        """
+        pages_per_task = max(1, settings.pdf_pages_per_task)
+        ranges = [
+            (start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, pages_per_task)
+        ]
+
+        next_index = 0
+        futures = []
+        try:
+            pool = _get_pool()
+            futures = [
+                pool.submit(_extract_page_range, file_path, start, end, settings.pdf_page_timeout_seconds)
+                for start, end in ranges
+            ]
+
+            for (start, end), future in zip(ranges, futures):
+                # Backstop in case a worker hangs somewhere the page alarm can't interrupt
+                timeout = settings.pdf_page_timeout_seconds * (end - start) + 30
+                for text in future.result(timeout=timeout):
+                    next_index += 1
+                    yield next_index, text
+
+        except FutureTimeout:
+            print(f"PDF extraction pool timed out on pages {next_index + 1}-{end} of {file_path}, "
+                  f"skipping them and extracting the rest serially")
+            for future in futures:
+                future.cancel()
+            _reset_pool(terminate=True)
+
+            # The hung range would hang again here; leave its pages empty
+            while next_index < end:
+                next_index += 1
+                yield next_index, SkippedPage()
+            yield from PDFExtractor._iter_serial(file_path, next_index, page_count)
+
+        except (BrokenProcessPool, CancelledError) as e:
+            # CancelledError: another extraction reset the shared pool
+            print(f"PDF extraction pool failed, extracting the rest serially: {e!r}")
+            _reset_pool()
+            yield from PDFExtractor._iter_serial(file_path, next_index, page_count)
+
+        finally:
+            # Stop queued ranges if the reader stops early
+            for future in futures:
+                future.cancel()
+
+    @staticmethod
+    def _iter_serial(file_path: str, start: int, page_count: int) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) for pages [start, page_count) in this process."""
+        for offset, text in enumerate(_extract_page_range(file_path, start, page_count, 0)):
+            yield start + offset + 1, text
 
     @staticmethod
     def extract_sections(file_path: str, chunk_size: int = 1000) -> List[Dict[str, any]]:
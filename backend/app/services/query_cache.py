@@ -0,0 +1,123 @@
+"""
+In-process cache for search query embeddings.
+LRU with TTL, and concurrent requests for the same query share one in-flight call.
+"""
+import asyncio
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.analytics_event import AnalyticsEvent
+from app.services.ai_provider import get_async_ai_provider
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    """LRU+TTL cache of normalized query -> embedding, with single-flight lookups."""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_embedding(self, query: str) -> Optional[List[float]]:
+        """
+        Return the embedding for a query, embedding it at most once per TTL.
+        Returns None if the query could not be embedded.
+        """
+        key = normalize_query(query)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, embedding = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+            del self._entries[key]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(get_async_ai_provider().embed_query(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        # Shield so a cancelled request doesn't cancel the call for other waiters
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        """Store a completed lookup and release its in-flight slot."""
+        self._in_flight.pop(key, None)
+
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        embedding = task.result()
+        # Failed lookups are retried on the next request
+        if embedding is None:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def warm(self, db: Session, limit: int) -> int:
+        """Pre-embed the most frequent queries from search analytics. Returns how many were cached."""
+        query_text = AnalyticsEvent.payload['query'].as_string()
+        rows = db.query(
+            query_text.label('query'),
+            func.count().label('count')
+        ).filter(
+            AnalyticsEvent.type == 'search_query'
+        ).group_by(
+            query_text
+        ).order_by(
+            func.count().desc()
+        ).limit(limit).all()
+
+        queries = {normalize_query(row.query) for row in rows if row.query}
+        await asyncio.gather(*(self.get_embedding(query) for query in queries))
+
+        # Queries whose embedding failed aren't cached; report them rather than claim success
+        warmed = sum(1 for query in queries if query in self._entries)
+        print(f"Warmed query embedding cache with {warmed} of {len(queries)} queries")
+        return warmed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+query_embedding_cache = QueryEmbeddingCache(
+    max_size=settings.query_cache_size,
+    ttl_seconds=settings.query_cache_ttl_seconds
+)
@@ -0,0 +1,118 @@
+"""
+Rate limiting service for AI API calls.
+Token buckets per operation type (generation, embedding), safe to share between
+threads and asyncio tasks, with wait-time statistics.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Any
+
+from app.config import settings
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at a fixed rate.
+
+    Callers reserve tokens under a lock and then sleep outside of it, so the
+    bucket can go negative: each reservation waits for the tokens it borrowed.
+    This keeps acquisition first-come-first-served across threads and tasks.
+    """
+
+    def __init__(self, name: str, requests_per_minute: int, burst: int = 1):
+        self.name = name
+        self.rate = requests_per_minute / 60.0  # tokens per second
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.acquisitions = 0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _reserve(self, tokens: float) -> float:
+        """Reserve tokens and return how long the caller must wait for them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= tokens
+
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+            self.acquisitions += 1
+            if wait > 0:
+                self.waits += 1
+                self.total_wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+            return wait
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Block the current thread until tokens are available. Returns seconds waited."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        """Wait without blocking the event loop until tokens are available."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Return wait-time statistics for this bucket."""
+        with self._lock:
+            return {
+                "requests_per_minute": round(self.rate * 60, 2),
+                "burst": self.capacity,
+                "acquisitions": self.acquisitions,
+                "waits": self.waits,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+                "avg_wait_seconds": round(self.total_wait_seconds / self.acquisitions, 3)
+                if self.acquisitions else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+            }
+
+
+class RateLimiter:
+    """Per-operation token buckets shared by all AI callers in the process."""
+
+    GENERATE = "generate"
+    EMBED = "embed"
+
+    def __init__(self, buckets: Dict[str, TokenBucket]):
+        self.buckets = buckets
+
+    def acquire(self, operation: str, tokens: float = 1) -> float:
+        """Block until the operation's quota allows another request."""
+        return self.buckets[operation].acquire(tokens)
+
+    async def acquire_async(self, operation: str, tokens: float = 1) -> float:
+        """Await until the operation's quota allows another request."""
+        return await self.buckets[operation].acquire_async(tokens)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return statistics for every bucket, keyed by operation."""
+        return {name: bucket.stats() for name, bucket in self.buckets.items()}
+
+
+# Singleton instance
+rate_limiter = RateLimiter({
+    RateLimiter.GENERATE: TokenBucket(
+        RateLimiter.GENERATE,
+        settings.ai_generate_rpm,
+        settings.ai_generate_burst
+    ),
+    RateLimiter.EMBED: TokenBucket(
+        RateLimiter.EMBED,
+        settings.ai_embed_rpm,
+        settings.ai_embed_burst
+    ),
+})
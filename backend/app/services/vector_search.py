@@ -0,0 +1,137 @@
+"""
+Vector similarity search over document sections.
+Supports exact cosine search and a two-phase search that first ranks candidates
+by Hamming distance over compact binary signatures, then rescores them with
+the full-precision embeddings. The first pass uses pgvector's <~> operator so
+the HNSW bit_hamming_ops index (pgvector 0.7+) can serve it; without that
+index it is a sequential scan, so two-phase search is off by default.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Optional
+
+from app.config import settings
+
+
+def to_pgvector(embedding: List[float]) -> str:
+    """Convert an embedding to PostgreSQL vector literal format."""
+    return "[" + ",".join(str(x) for x in embedding) + "]"
+
+
+def binary_signature(embedding: List[float]) -> str:
+    """
+    Quantize an embedding to one bit per dimension (sign), as a BIT string.
+    768 dimensions pack into 96 bytes instead of 3 KB of float32.
+    """
+    return "".join("1" if x > 0 else "0" for x in embedding)
+
+
+def _filters(tag_id: Optional[int], source_id: Optional[int]) -> tuple:
+    """Build the extra JOIN and WHERE clauses for optional filters."""
+    joins = ""
+    conditions = ""
+
+    if tag_id:
+        joins += " JOIN document_tags dt ON d.id = dt.document_id"
+        conditions += " AND dt.tag_id = :tag_id"
+
+    if source_id:
+        conditions += " AND d.source_id = :source_id"
+
+    return joins, conditions
+
+
+def build_search_query(
+    query_embedding: List[float],
+    limit: int,
+    tag_id: Optional[int] = None,
+    source_id: Optional[int] = None,
+    two_phase: Optional[bool] = None,
+    rescore_factor: Optional[int] = None
+) -> tuple:
+    """Return the (statement, params) that search_sections runs."""
+    if two_phase is None:
+        two_phase = settings.search_two_phase
+    if rescore_factor is None:
+        rescore_factor = settings.search_rescore_factor
+
+    joins, conditions = _filters(tag_id, source_id)
+    params = {
+        "query_embedding": to_pgvector(query_embedding),
+        "limit": limit,
+        "tag_id": tag_id,
+        "source_id": source_id,
+    }
+
+    if two_phase:
+        # Phase 1: Hamming ranking over 96-byte signatures, served by the HNSW index.
+        # Phase 2: exact cosine rescoring of the shortlisted candidates.
+        params["query_bits"] = binary_signature(query_embedding)
+        params["candidates"] = limit * rescore_factor
+
+        query = text(f"""
+            WITH candidates AS (
+                SELECT ds.id
+                FROM document_sections ds
+                JOIN documents d ON ds.document_id = d.id{joins}
+                WHERE ds.embedding_bits IS NOT NULL{conditions}
+                ORDER BY ds.embedding_bits <~> CAST(:query_bits AS bit(768))
+                LIMIT :candidates
+            )
+            SELECT
+                ds.id as section_id,
+                ds.document_id,
+                ds.text as snippet,
+                d.title,
+                d.url,
+                d.source_id,
+                1 - (ds.embedding <=> CAST(:query_embedding AS vector)) as score
+            FROM candidates c
+            JOIN document_sections ds ON ds.id = c.id
+            JOIN documents d ON ds.document_id = d.id
+            ORDER BY score DESC
+            LIMIT :limit
+        """)
+    else:
+        # Using cosine distance (1 - cosine_similarity); ordering by distance lets the ivfflat index serve it
+        query = text(f"""
+            SELECT
+                ds.id as section_id,
+                ds.document_id,
+                ds.text as snippet,
+                d.title,
+                d.url,
+                d.source_id,
+                1 - (ds.embedding <=> CAST(:query_embedding AS vector)) as score
+            FROM document_sections ds
+            JOIN documents d ON ds.document_id = d.id{joins}
+            WHERE ds.embedding IS NOT NULL{conditions}
+            ORDER BY ds.embedding <=> CAST(:query_embedding AS vector)
+            LIMIT :limit
+        """)
+
+    return query, params
+
+
+def search_sections(
+    db: Session,
+    query_embedding: List[float],
+    limit: int,
+    tag_id: Optional[int] = None,
+    source_id: Optional[int] = None,
+    two_phase: Optional[bool] = None,
+    rescore_factor: Optional[int] = None
+) -> list:
+    """
+    Return the sections most similar to the query embedding, ranked by cosine similarity.
+    Rows have section_id, document_id, snippet, title, url, source_id and score.
+    """
+    query, params = build_search_query(
+        query_embedding, limit, tag_id, source_id, two_phase, rescore_factor
+    )
+
+    if "candidates" in params:
+        # An HNSW scan returns at most ef_search rows (default 40)
+        db.execute(text(f"SET LOCAL hnsw.ef_search = {min(params['candidates'], 1000)}"))
+
+    return db.execute(query, params).fetchall()
@@ -0,0 +1,129 @@
+"""
+Compare the old fixed-window splitter (800 chars, 100 overlap) with the
+structure-aware chunker. Reports chunks per document, chunks under the
+minimum token budget, chunks that end mid-sentence, chunks longer than
+EMBEDDING_MAX_CHARS (their tail is cut off before embedding) and embedding
+calls (one per chunk unbatched, or per EMBEDDING_BATCH_SIZE chunks batched).
+
+Usage (from backend/):
+    python scripts/bench_chunker.py --documents 100
+    python scripts/bench_chunker.py --file notice.pdf --file report.txt
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.ai_provider import EMBEDDING_MAX_CHARS
+from app.services.chunker import chunk_text, count_tokens
+
+SENTENCE_ENDINGS = ".!?।॥"
+
+
+def fixed_window_chunks(content_text: str, chunk_size: int = 800, overlap: int = 100) -> list:
+    """The previous splitter, kept here as the baseline."""
+    chunks = []
+    start = 0
+    while start < len(content_text):
+        end = start + chunk_size
+        chunk = content_text[start:end]
+        if chunk.strip():
+            chunks.append(chunk)
+        start = end - overlap
+    return chunks
+
+
+def load_documents(args) -> list:
+    """Return (label, text) pairs from files or the documents table."""
+    if args.file:
+        from app.services.pdf_extractor import pdf_extractor
+
+        documents = []
+        for path in args.file:
+            if path.lower().endswith(".pdf"):
+                text = pdf_extractor.extract_text(path)
+            else:
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+            documents.append((os.path.basename(path), text))
+        return documents
+
+    from app.db.base import SessionLocal
+    from app.models.document import Document
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Document.id, Document.content_text).order_by(
+            Document.id.desc()
+        ).limit(args.documents).all()
+        return [(f"document {row.id}", row.content_text) for row in rows]
+    finally:
+        db.close()
+
+
+def measure(label: str, split, documents: list, batch_size: int):
+    counts = []
+    tiny = 0
+    mid_sentence = 0
+    truncated = 0
+    lengths = []
+    unbatched_calls = 0
+    batched_calls = 0
+
+    started = time.perf_counter()
+    for _, text in documents:
+        chunks = split(text)
+        counts.append(len(chunks))
+        unbatched_calls += len(chunks)
+        batched_calls += math.ceil(len(chunks) / batch_size)
+        for chunk in chunks:
+            if count_tokens(chunk) < settings.chunk_min_tokens:
+                tiny += 1
+            if chunk.rstrip()[-1:] not in SENTENCE_ENDINGS:
+                mid_sentence += 1
+            if len(chunk) > EMBEDDING_MAX_CHARS:
+                truncated += 1
+            lengths.append(len(chunk))
+    elapsed = (time.perf_counter() - started) * 1000
+
+    total = sum(counts)
+    print(
+        f"{label:<12} chunks/doc {statistics.mean(counts):7.1f}   total {total:6d}   "
+        f"tiny {tiny:5d}   mid-sentence {mid_sentence / total if total else 0:6.1%}   "
+        f"chars {statistics.mean(lengths) if lengths else 0:6.0f}   over {EMBEDDING_MAX_CHARS} {truncated:5d}   "
+        f"embed calls {unbatched_calls:6d} (batched {batched_calls:5d})   {elapsed:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document chunking")
+    parser.add_argument("--documents", type=int, default=100, help="Latest documents to chunk from the database")
+    parser.add_argument("--file", action="append", help="Chunk a .pdf or text file instead (repeatable)")
+    args = parser.parse_args()
+
+    documents = [(label, text) for label, text in load_documents(args) if text and text.strip()]
+    if not documents:
+        print("No documents to chunk")
+        return
+
+    print(
+        f"{len(documents)} documents, max {settings.chunk_max_tokens} / min {settings.chunk_min_tokens} tokens, "
+        f"max {settings.chunk_max_chars} chars, "
+        f"batch size {settings.embedding_batch_size}"
+    )
+    measure("before", fixed_window_chunks, documents, settings.embedding_batch_size)
+    measure(
+        "after",
+        lambda text: [chunk.text for chunk in chunk_text(text)],
+        documents,
+        settings.embedding_batch_size
+    )
+
+
+if __name__ == "__main__":
+    main()
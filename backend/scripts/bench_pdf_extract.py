@@ -0,0 +1,152 @@
+"""
+Compare the original multi-open PDF path (pdfplumber for text, then PyPDF2
+again for metadata; a frozen copy is kept below) with the single-pass
+PDFExtractor.extract on a local corpus. Reports per-file and total wall time
+and checks both paths return the same text.
+The extraction cache is disabled, so every run of the new path parses the file.
+
+Usage (from backend/):
+    python scripts/bench_pdf_extract.py ../storage/uploads
+    python scripts/bench_pdf_extract.py notice.pdf report.pdf --repeat 3
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+from PyPDF2 import PdfReader
+
+from app.services.extraction_cache import extraction_cache
+from app.services.pdf_extractor import pdf_extractor
+
+
+def original_extract_text(file_path: str) -> str:
+    """The original PDFExtractor.extract_text, kept here as the baseline."""
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            text_parts = []
+            for page in pdf.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    text_parts.append(page_text)
+
+            full_text = "\n\n".join(text_parts)
+            if full_text.strip():
+                return full_text
+
+    except Exception as e:
+        print(f"pdfplumber failed, trying PyPDF2: {e}")
+
+    try:
+        reader = PdfReader(file_path)
+        text_parts = []
+        for page in reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(page_text)
+
+        return "\n\n".join(text_parts)
+
+    except Exception as e:
+        print(f"PyPDF2 also failed: {e}")
+        return ""
+
+
+def original_get_metadata(file_path: str) -> dict:
+    """The original PDFExtractor.get_metadata, which opened the file again."""
+    try:
+        reader = PdfReader(file_path)
+        metadata = reader.metadata
+
+        return {
+            "title": metadata.get("/Title", None) if metadata else None,
+            "author": metadata.get("/Author", None) if metadata else None,
+            "subject": metadata.get("/Subject", None) if metadata else None,
+            "creator": metadata.get("/Creator", None) if metadata else None,
+            "num_pages": len(reader.pages)
+        }
+    except Exception as e:
+        print(f"Error extracting metadata: {e}")
+        return {"num_pages": 0}
+
+
+def multi_open(path: str) -> tuple:
+    """The original path: extract_text, then get_metadata opens the file again."""
+    text = original_extract_text(path)
+    metadata = original_get_metadata(path)
+    return text, metadata
+
+
+def single_pass(path: str) -> tuple:
+    extracted = pdf_extractor.extract(path)
+    return extracted.text, extracted.metadata
+
+
+def best_time(func, path: str, repeat: int) -> tuple:
+    """Return (result, fastest elapsed seconds) over repeat runs."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def collect(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-pass PDF extraction")
+    parser.add_argument("paths", nargs="+", help="PDF files or directories")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per file (fastest is reported)")
+    args = parser.parse_args()
+
+    # A cache hit would time a SQLite lookup, not extraction
+    extraction_cache.enabled = False
+
+    files = collect(args.paths)
+    if not files:
+        print("No PDF files found")
+        return
+
+    total_before = 0.0
+    total_after = 0.0
+    mismatches = 0
+
+    print(f"{'file':<40} {'pages':>6} {'multi-open':>11} {'single':>9} {'speedup':>8}")
+    for path in files:
+        (text_before, _), before = best_time(multi_open, path, args.repeat)
+        (text_after, metadata), after = best_time(single_pass, path, args.repeat)
+
+        total_before += before
+        total_after += after
+        if text_before != text_after:
+            mismatches += 1
+
+        speedup = before / after if after else 0.0
+        print(
+            f"{os.path.basename(path)[:40]:<40} {metadata.get('num_pages', 0):>6} "
+            f"{before * 1000:>9.1f}ms {after * 1000:>7.1f}ms {speedup:>7.2f}x"
+        )
+
+    print(
+        f"\n{len(files)} files: multi-open {total_before:.2f}s, single pass {total_after:.2f}s "
+        f"({total_before / total_after if total_after else 0:.2f}x), text mismatches: {mismatches}"
+    )
+
+
+if __name__ == "__main__":
+    main()
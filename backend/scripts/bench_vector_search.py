@@ -0,0 +1,126 @@
+"""
+Compare exact vector search with two-phase search (binary signature first
+pass + full-precision rescoring). Reports recall@k of the two-phase results
+against exact search and per-query latency. With --explain, prints the query
+plans instead, to check that each phase is served by an index.
+
+Usage (from backend/):
+    python scripts/bench_vector_search.py --queries 50 --limit 10 --factors 5,10,20
+    python scripts/bench_vector_search.py --text "housing budget" --text "road repair"
+    python scripts/bench_vector_search.py --explain
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.db.base import SessionLocal, engine
+from app.services.vector_search import build_search_query, search_sections
+
+
+def sample_embeddings(db, count: int) -> list:
+    """Use random stored section embeddings as queries."""
+    rows = db.execute(text("""
+        SELECT embedding::text AS embedding
+        FROM document_sections
+        WHERE embedding IS NOT NULL
+        ORDER BY random()
+        LIMIT :count
+    """), {"count": count}).fetchall()
+
+    return [[float(x) for x in row.embedding.strip("[]").split(",")] for row in rows]
+
+
+def timed_search(db, embedding, limit, **kwargs) -> tuple:
+    """Run one search and return (section ids, elapsed milliseconds)."""
+    started = time.perf_counter()
+    rows = search_sections(db, embedding, limit, **kwargs)
+    elapsed = (time.perf_counter() - started) * 1000
+    return [row.section_id for row in rows], elapsed
+
+
+def explain(db, embedding, limit, factor):
+    """Print EXPLAIN ANALYZE for the exact and two-phase queries."""
+    for label, two_phase in (("exact", False), (f"two-phase x{factor}", True)):
+        query, params = build_search_query(embedding, limit, two_phase=two_phase, rescore_factor=factor)
+        print(f"--- {label}")
+        try:
+            if two_phase:
+                db.execute(text(f"SET LOCAL hnsw.ef_search = {min(limit * factor, 1000)}"))
+            plan = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query.text}"), params).fetchall()
+            # Elide the vector and bit literals
+            print("\n".join(re.sub(r"'[\[\]0-9.,e+-]{64,}'", "'...'", row[0]) for row in plan))
+        except Exception as e:
+            print(f"Not available: {e.__class__.__name__}: {str(e).splitlines()[0]}")
+        db.rollback()
+
+
+def summarize(label: str, latencies: list, recalls: list = None):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    line = f"{label:<22} p50 {statistics.median(latencies):8.2f} ms   p95 {p95:8.2f} ms"
+    if recalls is not None:
+        line += f"   recall@k {statistics.mean(recalls):.3f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=50, help="Random section embeddings to use as queries")
+    parser.add_argument("--text", action="append", default=[], help="Query text to embed (repeatable)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--factors", default="5,10,20", help="Comma-separated rescore factors to compare")
+    parser.add_argument("--explain", action="store_true", help="Print query plans for the first query and exit")
+    args = parser.parse_args()
+
+    engine.echo = False
+    db = SessionLocal()
+
+    try:
+        if args.text:
+            from app.services.ai_provider import get_ai_provider
+            embeddings = [e for e in (get_ai_provider().embed_query(t) for t in args.text) if e is not None]
+        else:
+            embeddings = sample_embeddings(db, args.queries)
+
+        if not embeddings:
+            print("No query embeddings available")
+            return
+
+        factors = [int(f) for f in args.factors.split(",")]
+        if args.explain:
+            explain(db, embeddings[0], args.limit, factors[0])
+            return
+
+        exact_latencies = []
+        exact_results = []
+        phase_latencies = {factor: [] for factor in factors}
+        phase_recalls = {factor: [] for factor in factors}
+
+        for embedding in embeddings:
+            exact_ids, elapsed = timed_search(db, embedding, args.limit, two_phase=False)
+            exact_results.append(set(exact_ids))
+            exact_latencies.append(elapsed)
+
+            for factor in factors:
+                ids, elapsed = timed_search(db, embedding, args.limit, two_phase=True, rescore_factor=factor)
+                phase_latencies[factor].append(elapsed)
+                if exact_ids:
+                    phase_recalls[factor].append(len(set(ids) & set(exact_ids)) / len(exact_ids))
+
+        print(f"{len(embeddings)} queries, k={args.limit}")
+        summarize("exact", exact_latencies)
+        for factor in factors:
+            summarize(f"two-phase x{factor}", phase_latencies[factor], phase_recalls[factor] or [0.0])
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
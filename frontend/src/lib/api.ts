@@ -87,6 +87,9 @@ export interface CrawlJob {
   started_at?: string;
   finished_at?: string;
   error_message?: string;
+  bytes_downloaded?: number;
+  bytes_saved?: number;
+  not_modified?: number;
   created_at: string;
 }
 